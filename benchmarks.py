@@ -0,0 +1,192 @@
+"""
+Бенчмарки производительности модели данных
+
+Запуск:
+    python benchmarks.py memory [размеры...]
+    python benchmarks.py formats [размеры...]
+    python benchmarks.py exports [размеры...]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, List
+
+from models import Task
+from storage import BaseStorage, DataStorage, ExcelExporter
+from binary_storage import BinaryStorage, zstandard
+from exporters import CsvExporter, ColumnarExporter, pyarrow
+
+
+@dataclass
+class LegacyTask:
+    """Прежнее представление задачи: обычный dataclass с __dict__"""
+    id: str
+    object: str
+    start_date: str
+    end_date: str
+    duration: int = 0
+    dependencies: List[str] = field(default_factory=list)
+    type: str = ""
+
+
+TASK_TYPES = ["FS - Finish-Start", "SS - Start-Start", "FF - Finish-Finish",
+              "SF - Start-Finish", "--"]
+
+
+def generate_task_dicts(count: int, seed: int = 42) -> List[dict]:
+    """Сгенерировать синтетический проект в формате Task.to_dict"""
+    rng = random.Random(seed)
+    base = date(2025, 1, 1).toordinal()
+    result = []
+    for i in range(count):
+        start = base + rng.randint(0, 365)
+        end = start + rng.randint(0, 30)
+        dependencies = []
+        if i > 0:
+            for _ in range(rng.randint(0, 3)):
+                dep = rng.randint(max(0, i - 500), i - 1)
+                dependencies.append(f"WBS-{dep:07d} - Объект {dep}")
+        result.append({
+            "id": f"WBS-{i:07d}",
+            "object": f"Объект {i}",
+            "start_date": date.fromordinal(start).strftime("%d.%m.%Y"),
+            "end_date": date.fromordinal(end).strftime("%d.%m.%Y"),
+            "duration": end - start + 1,
+            "dependencies": dependencies,
+            "type": rng.choice(TASK_TYPES)
+        })
+    return result
+
+
+def measure_memory(factory: Callable[[dict], object], json_text: str) -> tuple:
+    """
+    Загрузить задачи из JSON-текста, как при открытии проекта
+
+    Returns:
+        tuple: (байт, занятых объектами после освобождения словарей, секунды)
+    """
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = json.loads(json_text)
+    objects = [factory(row) for row in rows]
+    elapsed = time.perf_counter() - started
+    del rows
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current, elapsed
+
+
+def bench_memory(sizes=(10_000, 100_000, 1_000_000)):
+    """Сравнить память прежнего dataclass и компактного Task"""
+    print(f"{'Задач':>10} | {'dict-dataclass, МБ':>18} | {'slots Task, МБ':>15} | {'Экономия':>8}")
+    for size in sizes:
+        json_text = json.dumps(generate_task_dicts(size), ensure_ascii=False)
+        legacy_bytes, legacy_time = measure_memory(lambda d: LegacyTask(**d), json_text)
+        compact_bytes, compact_time = measure_memory(Task.from_dict, json_text)
+        saving = 1 - compact_bytes / legacy_bytes if legacy_bytes else 0
+        print(f"{size:>10} | {legacy_bytes / 2**20:>18.1f} | "
+              f"{compact_bytes / 2**20:>15.1f} | {saving:>7.0%}"
+              f"   (загрузка: {legacy_time:.2f} с / {compact_time:.2f} с)")
+        del json_text
+
+
+def measure_round_trip(storage: BaseStorage, tasks: List[Task]) -> tuple:
+    """
+    Сохранить и загрузить задачи через хранилище
+
+    Returns:
+        tuple: (секунды записи, секунды чтения, байт на диске)
+    """
+    started = time.perf_counter()
+    if not storage.save_tasks(tasks):
+        raise RuntimeError(f"Не удалось сохранить {storage.filename}")
+    saved = time.perf_counter()
+    loaded = storage.load_tasks()
+    finished = time.perf_counter()
+    if [task.to_dict() for task in loaded] != [task.to_dict() for task in tasks]:
+        raise RuntimeError(f"Данные {storage.filename} не совпали после загрузки")
+    return saved - started, finished - saved, os.path.getsize(storage.filepath)
+
+
+def bench_formats(sizes=(10_000, 100_000)):
+    """Сравнить JSON и бинарный формат .prjb: запись, чтение, размер"""
+    formats = [
+        ("JSON", lambda path: DataStorage(path, generations=0)),
+        (".prjb", lambda path: BinaryStorage(path, generations=0)),
+        (".prjb zlib", lambda path: BinaryStorage(path, generations=0, compression="zlib")),
+    ]
+    if zstandard is not None:
+        formats.append((".prjb zstd",
+                        lambda path: BinaryStorage(path, generations=0, compression="zstd")))
+
+    print(f"{'Задач':>10} | {'Формат':<11} | {'Запись, с':>9} | {'Чтение, с':>9} | {'Размер, МБ':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            tasks = [Task.from_dict(data) for data in generate_task_dicts(size)]
+            for name, factory in formats:
+                path = os.path.join(directory, f"bench_{size}{name.split()[0]}")
+                write_time, read_time, file_size = measure_round_trip(factory(path), tasks)
+                print(f"{size:>10} | {name:<11} | {write_time:>9.2f} | "
+                      f"{read_time:>9.2f} | {file_size / 2**20:>10.1f}")
+
+
+def bench_exports(sizes=(10_000, 100_000)):
+    """Сравнить экспорт в xlsx (openpyxl и по разделам), CSV и столбцовый формат"""
+    columnar_suffix = ".parquet" if pyarrow is not None else ColumnarExporter.FALLBACK_SUFFIX
+    exports = [
+        ("xlsx openpyxl", ".xlsx",
+         lambda tasks, path: ExcelExporter.export_to_excel(tasks, path, streaming=True)),
+        ("xlsx разделы", ".xlsx",
+         lambda tasks, path: ExcelExporter.export_partitioned(tasks, path, depth=1, workers=1)),
+        ("CSV", ".csv", CsvExporter.export),
+        (columnar_suffix.lstrip("."), columnar_suffix, ColumnarExporter.export),
+    ]
+
+    print(f"{'Задач':>10} | {'Экспорт':<13} | {'Время, с':>8} | {'Размер, МБ':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            tasks = [Task.from_dict(data) for data in generate_task_dicts(size)]
+            for name, suffix, export in exports:
+                path = os.path.join(directory, f"bench_{size}_{len(name)}{suffix}")
+                started = time.perf_counter()
+                success, message = export(tasks, path)
+                elapsed = time.perf_counter() - started
+                if not success:
+                    print(f"{size:>10} | {name:<13} | {message}")
+                    continue
+                print(f"{size:>10} | {name:<13} | {elapsed:>8.2f} | "
+                      f"{os.path.getsize(path) / 2**20:>10.1f}")
+
+
+BENCHMARKS = {
+    "memory": bench_memory,
+    "formats": bench_formats,
+    "exports": bench_exports,
+}
+
+
+def main(argv: List[str]):
+    """Точка входа"""
+    if not argv or argv[0] not in BENCHMARKS:
+        print(__doc__)
+        print("Доступные бенчмарки:", ", ".join(BENCHMARKS))
+        return
+    sizes = [int(arg) for arg in argv[1:]]
+    if sizes:
+        BENCHMARKS[argv[0]](sizes)
+    else:
+        BENCHMARKS[argv[0]]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,275 @@
+"""
+Компактный бинарный формат проекта (.prjb)
+
+Структура файла (little-endian):
+    заголовок   "PRJB", версия u16, сжатие u16, задач u32, строк u32,
+                номер записи журнала u64
+    каталог     для каждой секции: размер данных u64, размер на диске u64
+    секции      таблица строк (UTF-8 через NUL), затем столбцы задач:
+                ID, объект, даты (индекс строки + порядковый номер дня),
+                длительность, тип, смещения и индексы меток зависимостей
+
+Каждая секция выровнена на 8 байт и может быть сжата zlib или zstd.
+Несжатые столбцы читаются прямо из отображенного в память файла.
+"""
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from models import Task, parse_date_ordinal
+from storage import DataStorage
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC = b"PRJB"
+FORMAT_VERSION = 1
+
+COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD = 0, 1, 2
+_COMPRESSION_CODES = {None: COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB,
+                      "zstd": COMPRESSION_ZSTD}
+
+_HEADER = struct.Struct("<4sHHIIQ")
+_SECTION = struct.Struct("<QQ")
+
+# Секции после таблицы строк: (имя, код типа array)
+_COLUMNS = (
+    ("id", "I"),
+    ("object", "I"),
+    ("start_date", "I"),
+    ("end_date", "I"),
+    ("start_ordinal", "i"),
+    ("end_ordinal", "i"),
+    ("duration", "i"),
+    ("type", "I"),
+    ("dep_offsets", "I"),
+    ("dep_labels", "I"),
+)
+
+_ALIGN = 8
+_NATIVE_LITTLE = sys.byteorder == "little"
+
+
+def _compress(raw: bytes, compression: int) -> bytes:
+    """Сжать секцию"""
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(raw, 6)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return raw
+
+
+def _decompress(stored, compression: int, size: int):
+    """Распаковать секцию (несжатая возвращается как есть)"""
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(stored, bufsize=max(size, 1))
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("Файл сжат zstd, а библиотека zstandard не установлена")
+        return zstandard.ZstdDecompressor().decompress(stored, max_output_size=size)
+    return stored
+
+
+def _column_bytes(values: List[int], typecode: str) -> bytes:
+    """Столбец целых чисел в little-endian"""
+    column = array(typecode, values)
+    if not _NATIVE_LITTLE:
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(data, typecode: str):
+    """Столбец из байтов: без копирования, если порядок байт совпадает"""
+    if _NATIVE_LITTLE:
+        return memoryview(data).cast(typecode)
+    column = array(typecode)
+    column.frombytes(bytes(data))
+    column.byteswap()
+    return column
+
+
+def encode_project(task_dicts: Iterable[dict], journal_seq: int = 0,
+                   compression: Optional[str] = None) -> bytes:
+    """
+    Закодировать задачи (в формате Task.to_dict) в байты .prjb
+
+    compression: None, "zlib" или "zstd"
+    """
+    code = _COMPRESSION_CODES[compression]
+    if code == COMPRESSION_ZSTD and zstandard is None:
+        raise ValueError("Библиотека zstandard не установлена. Выполните: pip install zstandard")
+
+    strings: Dict[str, int] = {}
+
+    def string_index(text: str) -> int:
+        index = strings.get(text)
+        if index is None:
+            if "\x00" in text:
+                raise ValueError("Строки с символом NUL не поддерживаются")
+            index = strings[text] = len(strings)
+        return index
+
+    columns = {name: [] for name, _ in _COLUMNS}
+    columns["dep_offsets"].append(0)
+    count = 0
+    for data in task_dicts:
+        count += 1
+        start_ordinal = parse_date_ordinal(data["start_date"])
+        end_ordinal = parse_date_ordinal(data["end_date"])
+        columns["id"].append(string_index(data["id"]))
+        columns["object"].append(string_index(data["object"]))
+        columns["start_date"].append(string_index(data["start_date"]))
+        columns["end_date"].append(string_index(data["end_date"]))
+        # 0 - дата некорректна (порядковые номера дней начинаются с 1)
+        columns["start_ordinal"].append(start_ordinal or 0)
+        columns["end_ordinal"].append(end_ordinal or 0)
+        columns["duration"].append(data["duration"])
+        columns["type"].append(string_index(data["type"] or ""))
+        labels = columns["dep_labels"]
+        labels.extend(string_index(label) for label in data["dependencies"])
+        columns["dep_offsets"].append(len(labels))
+
+    sections = ["\x00".join(strings).encode("utf-8")]
+    sections += [_column_bytes(columns[name], typecode) for name, typecode in _COLUMNS]
+
+    stored = [_compress(raw, code) for raw in sections]
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, code, count, len(strings), journal_seq)]
+    parts += [_SECTION.pack(len(raw), len(data)) for raw, data in zip(sections, stored)]
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    for data in stored:
+        padding = -offset % _ALIGN
+        parts.append(b"\x00" * padding)
+        parts.append(data)
+        offset += padding + len(data)
+    return b"".join(parts)
+
+
+def decode_project(buffer) -> tuple:
+    """
+    Прочитать задачи из байтов .prjb (bytes или mmap)
+
+    Returns:
+        tuple: (задачи, номер записи журнала)
+    """
+    view = memoryview(buffer)
+    # Все срезы отображенного файла освобождаются до его закрытия
+    exported = [view]
+    try:
+        magic, version, code, count, string_count, journal_seq = \
+            _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Файл не является проектом .prjb")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата: {version}")
+
+        offset = _HEADER.size
+        directory = []
+        for _ in range(len(_COLUMNS) + 1):
+            directory.append(_SECTION.unpack_from(view, offset))
+            offset += _SECTION.size
+
+        sections = []
+        for size, stored_size in directory:
+            offset += -offset % _ALIGN
+            stored = view[offset:offset + stored_size]
+            exported.append(stored)
+            if len(stored) != stored_size:
+                raise ValueError("Файл обрезан")
+            sections.append(_decompress(stored, code, size))
+            offset += stored_size
+
+        strings = bytes(sections[0]).decode("utf-8").split("\x00") if string_count else []
+        if len(strings) != string_count:
+            raise ValueError("Таблица строк повреждена")
+
+        columns = []
+        for data, (_, typecode) in zip(sections[1:], _COLUMNS):
+            column = _read_column(data, typecode)
+            if isinstance(column, memoryview):
+                exported.append(column)
+            columns.append(column.tolist())
+        del sections
+        return _build_tasks(count, strings, *columns), journal_seq
+    finally:
+        for exported_view in reversed(exported):
+            exported_view.release()
+
+
+def _build_tasks(count, strings, ids, objects, start_dates, end_dates,
+                 start_ordinals, end_ordinals, durations, types,
+                 dep_offsets, dep_labels) -> List[Task]:
+    """Собрать задачи из столбцов"""
+    from_ordinals = Task.from_ordinals
+    return [
+        from_ordinals(
+            strings[ids[i]],
+            strings[objects[i]],
+            strings[start_dates[i]],
+            strings[end_dates[i]],
+            start_ordinals[i] or None,
+            end_ordinals[i] or None,
+            durations[i],
+            [strings[j] for j in dep_labels[dep_offsets[i]:dep_offsets[i + 1]]],
+            strings[types[i]]
+        )
+        for i in range(count)
+    ]
+
+
+def read_project_file(path: Path) -> tuple:
+    """
+    Прочитать файл .prjb через отображение в память
+
+    Returns:
+        tuple: (задачи, номер записи журнала)
+    """
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            raise ValueError("Файл пуст")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_project(mapped)
+
+
+class BinaryStorage(DataStorage):
+    """
+    Хранилище задач в бинарном файле .prjb
+
+    Запись, версии файла и журнал изменений работают так же, как у
+    DataStorage; отличается только кодирование файла.
+    """
+
+    FORMAT_VERSION = str(FORMAT_VERSION)
+
+    def __init__(self, filename: str = "project_data.prjb", generations: int = 3,
+                 compression: Optional[str] = None):
+        super().__init__(filename, generations)
+        self.compression = compression
+
+    def _encode(self, data: dict) -> bytes:
+        """Закодировать снимок в .prjb"""
+        return encode_project(data["tasks"], data.get("journal_seq", 0), self.compression)
+
+    def snapshot_seq(self, path: Path) -> Optional[int]:
+        """Номер записи журнала из заголовка файла (None, если файл не читается)"""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(_HEADER.size)
+            magic, _, _, _, _, journal_seq = _HEADER.unpack(header)
+        except Exception:
+            return None
+        return journal_seq if magic == MAGIC else None
+
+    def stream_tasks(self, path: Optional[Path] = None,
+                     meta: Optional[dict] = None) -> Iterator[Task]:
+        """Прочитать задачи файла (целиком: формат читается быстрее JSON)"""
+        tasks, journal_seq = read_project_file(path or self.filepath)
+        if meta is not None:
+            meta["version"] = self.FORMAT_VERSION
+            meta["journal_seq"] = journal_seq
+        return iter(tasks)
@@ -1,14 +1,23 @@
 """
 Контроллер приложения с поддержкой фильтрации.
 """
-from typing import Optional
-from datetime import datetime
-from models import Task, TaskManager
+import queue
+import threading
+from functools import partial
+from itertools import islice
+from typing import Callable, Optional
+from models import Task, TaskManager, parse_dependency_id
 from dialogs import DialogFactory
 from views import (TaskTableView, NotificationView, ContextMenuView,
                   HeaderView, TabsView, TableContainerView, MenuBarView,
-                  FilterPanelView)
-from storage import DataStorage, ExcelExporter, AutoSaveManager
+                  FilterPanelView, ProgressView)
+from storage import (DataStorage, ExcelExporter, AutoSaveManager, ChangeJournal,
+                     open_storage)
+from sqlite_storage import SQLiteStorage, export_sqlite_to_json, migrate_json_to_sqlite
+from exporters import CsvExporter, ColumnarExporter
+from importers import ImportCancelled, ImportResult, TaskImporter
+from scheduler import CriticalPathScheduler
+from filters import TaskFilterIndex, FilterQueryScheduler
 
 
 class TaskController:
@@ -21,12 +30,21 @@ class TaskController:
         self.notification_view = notification_view
         self.parent = parent
         self.clipboard_task: Optional[Task] = None
+        self.scheduler = CriticalPathScheduler(task_manager)
+        self.filter_index = TaskFilterIndex(task_manager)
+        self.filter_scheduler = FilterQueryScheduler(
+            self.filter_index, parent, self._on_filter_result
+        )
         self.dependency_popup_open = False
         self.current_dependency_dialog = None
+        # Изменения запрещены, пока файл проекта дочитывается при запуске
+        self.editing_locked = False
         
         # Фильтры
         self.current_filters = {}
-        self.all_tasks = []
+        # Кэш отфильтрованного представления: (версия данных, фильтры) -> задачи
+        self._view_key = None
+        self._view_tasks = []
 
         self._bind_events()
 
@@ -37,106 +55,89 @@ class TaskController:
         self.table_view.bind_paste(self._on_paste_key)
 
     def set_filters(self, filters: dict):
-        """Установить фильтры и обновить представление"""
+        """Установить фильтры; список пересчитывается в фоновом потоке"""
+        if filters == self.current_filters and not self.filter_scheduler.is_pending:
+            return
+        self.filter_scheduler.submit(filters)
+
+    def _on_filter_result(self, filters: dict, tasks: list, version: int):
+        """Показать результат фонового запроса фильтрации"""
         self.current_filters = filters
-        self.refresh_view()
+        self._view_key = self._make_view_key(version, filters)
+        self._view_tasks = tasks
+        self.table_view.populate(tasks, self.scheduler)
 
     def _apply_filters(self, tasks: list) -> list:
-        """Применить фильтры к списку задач"""
+        """Применить фильтры к полному списку задач через индексы"""
         if not self.current_filters:
             return tasks
-        
-        filtered_tasks = tasks.copy()
-        
-        # Фильтр поиска
-        search_text = self.current_filters.get('search', '')
-        if search_text:
-            filtered_tasks = [
-                task for task in filtered_tasks
-                if search_text in task.id.lower() or search_text in task.object.lower()
-            ]
-        
-        # Фильтр по типу зависимости
-        dep_type = self.current_filters.get('type', 'Все')
-        if dep_type != 'Все':
-            if dep_type == 'Без типа':
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if not task.type or task.type in ['', '--']
-                ]
-            else:
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if task.type == dep_type
-                ]
-        
-        # Фильтр по количеству зависимостей
-        deps_filter = self.current_filters.get('dependencies', 'Все')
-        if deps_filter != 'Все':
-            if deps_filter == 'Без зависимостей':
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if not task.dependencies
-                ]
-            elif deps_filter == 'С зависимостями':
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if task.dependencies
-                ]
-            elif deps_filter == '1 зависимость':
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if len(task.dependencies) == 1
-                ]
-            elif deps_filter == '2+ зависимости':
-                filtered_tasks = [
-                    task for task in filtered_tasks
-                    if len(task.dependencies) >= 2
-                ]
-        
-        # Фильтр по датам
-        if self.current_filters.get('date_enabled', False):
-            start_date_str = self.current_filters.get('start_date')
-            end_date_str = self.current_filters.get('end_date')
-            
-            if start_date_str and end_date_str:
-                try:
-                    filter_start = datetime.strptime(start_date_str, "%d.%m.%Y")
-                    filter_end = datetime.strptime(end_date_str, "%d.%m.%Y")
-                    
-                    filtered_tasks = [
-                        task for task in filtered_tasks
-                        if self._task_in_date_range(task, filter_start, filter_end)
-                    ]
-                except:
-                    pass
-        
+
+        filtered_tasks = self.filter_index.filter_tasks(self.current_filters)
+        if filtered_tasks is None:
+            return tasks
         return filtered_tasks
 
-    def _task_in_date_range(self, task: Task, filter_start: datetime, 
-                           filter_end: datetime) -> bool:
-        """Проверить, попадает ли задача в диапазон дат"""
-        try:
-            task_start = datetime.strptime(task.start_date, "%d.%m.%Y")
-            task_end = datetime.strptime(task.end_date, "%d.%m.%Y")
-            
-            # Задача попадает в диапазон, если есть пересечение
-            return not (task_end < filter_start or task_start > filter_end)
-        except:
-            return False
+    def _get_filtered_tasks(self) -> list:
+        """Получить отфильтрованный список задач (кэшируется до изменения данных)"""
+        key = self._make_view_key(self.task_manager.version, self.current_filters)
+        if key != self._view_key:
+            self._view_tasks = self._apply_filters(self.task_manager.get_all_tasks())
+            self._view_key = key
+        return self._view_tasks
+
+    @staticmethod
+    def _make_view_key(version: int, filters: dict) -> tuple:
+        """Ключ кэша отфильтрованного представления"""
+        return version, tuple(sorted(filters.items()))
+
+    def _get_row_task(self, row_index: Optional[int]) -> Optional[tuple]:
+        """
+        Найти задачу по номеру строки таблицы
+
+        Returns:
+            tuple: (задача, индекс в TaskManager) или None
+        """
+        if row_index is None:
+            return None
+        filtered_tasks = self._get_filtered_tasks()
+        if not 0 <= row_index < len(filtered_tasks):
+            return None
+        task = filtered_tasks[row_index]
+        real_index = self.task_manager.index_of(task.id)
+        if real_index is None:
+            return None
+        return task, real_index
+
+    def _has_active_filters(self) -> bool:
+        """Проверить, сужают ли текущие фильтры список задач"""
+        filters = self.current_filters
+        return bool(
+            filters.get('search')
+            or filters.get('type', 'Все') != 'Все'
+            or filters.get('dependencies', 'Все') != 'Все'
+            or filters.get('date_enabled', False)
+        )
 
     def refresh_view(self):
+        """Пересчитать расписание и обновить представление"""
+        self.scheduler.recompute()
+        self._populate_view()
+
+    def _populate_view(self):
         """Обновить представление с учетом фильтров"""
-        all_tasks = self.task_manager.get_all_tasks()
-        self.all_tasks = all_tasks
-        
-        # Применяем фильтры
-        filtered_tasks = self._apply_filters(all_tasks)
-        
-        self.table_view.populate(filtered_tasks)
+        self.table_view.populate(self._get_filtered_tasks(), self.scheduler)
+
+    def _check_editable(self) -> bool:
+        """Предупредить, если изменять задачи сейчас нельзя"""
+        if self.editing_locked:
+            self.notification_view.show("⏳ Дождитесь окончания загрузки проекта")
+            return False
+        return True
 
     def add_task(self):
         """Добавить задачу"""
+        if not self._check_editable():
+            return
         DialogFactory.create_add_task_dialog(
             self.parent,
             self._handle_add_task
@@ -157,26 +158,12 @@ class TaskController:
 
     def edit_task(self, event=None):
         """Редактировать задачу"""
-        index = self.table_view.get_selected_index()
-        if index is None:
-            return
-
-        # Получаем задачу из отфильтрованного списка
-        filtered_tasks = self._apply_filters(self.all_tasks)
-        if index >= len(filtered_tasks):
+        if not self._check_editable():
             return
-        
-        task = filtered_tasks[index]
-        
-        # Находим реальный индекс в полном списке
-        real_index = None
-        for i, t in enumerate(self.all_tasks):
-            if t.id == task.id:
-                real_index = i
-                break
-        
-        if real_index is None:
+        row_task = self._get_row_task(self.table_view.get_selected_index())
+        if row_task is None:
             return
+        task, real_index = row_task
 
         DialogFactory.create_edit_task_dialog(
             self.parent,
@@ -194,43 +181,48 @@ class TaskController:
                 return False
 
         if updated_task.dependencies:
-            for dep_label in updated_task.dependencies:
-                dep_id = dep_label.split(" - ")[0].strip() if dep_label else ""
+            for dep_id in updated_task.dependency_ids():
                 dep_task = self.task_manager.get_task_by_id(dep_id)
-                if dep_task and dep_task.start_date == updated_task.start_date:
+                if dep_task and self._same_start(dep_task, updated_task):
                     self.notification_view.show(
                         f"❌ Дата начала совпадает с зависимостью: {dep_id}"
                     )
                     return False
 
         if self.task_manager.update_task(index, updated_task):
-            self.refresh_view()
+            if updated_task.id == old_task.id and not self._has_active_filters():
+                # Без фильтров набор строк не меняется: обновляем только
+                # задачу и ее последователей, чьи даты сдвинулись
+                changed_ids = self.scheduler.reschedule_task(updated_task.id)
+                if self.table_view.is_virtual:
+                    # Окно строк берет задачи из списка: подменяем его
+                    self._populate_view()
+                else:
+                    self.table_view.update_rows(
+                        [self.task_manager.get_task_by_id(task_id) for task_id in changed_ids],
+                        self.scheduler
+                    )
+            else:
+                self.refresh_view()
             self.notification_view.show(f"✅ Задача {updated_task.id} обновлена")
             return True
         return False
 
+    @staticmethod
+    def _same_start(first: Task, second: Task) -> bool:
+        """Проверить совпадение дат начала двух задач"""
+        if first.start_ordinal is None or second.start_ordinal is None:
+            return first.start_date == second.start_date
+        return first.start_ordinal == second.start_ordinal
+
     def delete_task(self):
         """Удалить задачу"""
-        index = self.table_view.get_selected_index()
-        if index is None:
+        if not self._check_editable():
             return
-
-        # Получаем задачу из отфильтрованного списка
-        filtered_tasks = self._apply_filters(self.all_tasks)
-        if index >= len(filtered_tasks):
-            return
-        
-        task = filtered_tasks[index]
-        
-        # Находим реальный индекс
-        real_index = None
-        for i, t in enumerate(self.all_tasks):
-            if t.id == task.id:
-                real_index = i
-                break
-        
-        if real_index is None:
+        row_task = self._get_row_task(self.table_view.get_selected_index())
+        if row_task is None:
             return
+        task, real_index = row_task
 
         DialogFactory.create_delete_confirmation_dialog(
             self.parent,
@@ -252,15 +244,10 @@ class TaskController:
 
     def copy_task(self):
         """Копировать задачу"""
-        index = self.table_view.get_selected_index()
-        if index is None:
-            return
-
-        filtered_tasks = self._apply_filters(self.all_tasks)
-        if index >= len(filtered_tasks):
+        row_task = self._get_row_task(self.table_view.get_selected_index())
+        if row_task is None:
             return
-        
-        task = filtered_tasks[index]
+        task, _ = row_task
 
         if task:
             self.clipboard_task = Task(
@@ -280,6 +267,8 @@ class TaskController:
 
     def paste_task(self):
         """Вставить задачу из буфера"""
+        if not self._check_editable():
+            return
         if not self.clipboard_task:
             self.notification_view.show("⚠️ Буфер обмена пуст")
             return
@@ -315,41 +304,22 @@ class TaskController:
         if self.dependency_popup_open or self.current_dependency_dialog:
             self._force_close_dependency_dialog()
             return
+        if not self._check_editable():
+            return
 
         self.dependency_popup_open = True
 
         try:
-            row_index = self.table_view.tree.index(row_id)
+            row_index = self.table_view.get_row_index(row_id)
         except:
             self.dependency_popup_open = False
             return
 
-        # Получаем задачу из отфильтрованного списка
-        filtered_tasks = self._apply_filters(self.all_tasks)
-        if row_index >= len(filtered_tasks):
-            self.dependency_popup_open = False
-            return
-        
-        current_task = filtered_tasks[row_index]
-
-        if not current_task:
+        row_task = self._get_row_task(row_index)
+        if row_task is None:
             self.dependency_popup_open = False
             return
-
-        # Находим реальный индекс
-        real_index = None
-        for i, t in enumerate(self.all_tasks):
-            if t.id == current_task.id:
-                real_index = i
-                break
-
-        if real_index is None:
-            self.dependency_popup_open = False
-            return
-
-        available_tasks = self.task_manager.get_available_dependencies(
-            current_task.id
-        )
+        current_task, real_index = row_task
 
         def save_callback(deps):
             self._handle_save_dependencies(real_index, deps)
@@ -360,9 +330,10 @@ class TaskController:
         dialog = DialogFactory.create_dependency_dialog(
             self.parent,
             current_task,
-            available_tasks,
+            self.task_manager,
             save_callback,
-            close_callback
+            close_callback,
+            self.filter_index
         )
         
         self.current_dependency_dialog = dialog
@@ -381,16 +352,25 @@ class TaskController:
         task = self.task_manager.get_task_by_index(index)
         if task:
             for dep_label in dependencies:
-                dep_id = dep_label.split(" - ")[0].strip() if dep_label else ""
+                dep_id = parse_dependency_id(dep_label)
                 dep_task = self.task_manager.get_task_by_id(dep_id)
-                if dep_task and dep_task.start_date == task.start_date:
+                if dep_task and self._same_start(dep_task, task):
                     self.notification_view.show(
                         f"❌ Нельзя выбрать зависимость с такой же датой начала: {dep_id}"
                     )
                     self._force_close_dependency_dialog()
                     return
 
-            task.dependencies = dependencies
+            cycle = self.task_manager.find_dependency_cycle(task.id, dependencies)
+            if cycle:
+                self.notification_view.show(
+                    f"❌ Циклическая зависимость: {' → '.join(cycle)}",
+                    duration=4000
+                )
+                self._force_close_dependency_dialog()
+                return
+
+            self.task_manager.set_dependencies(task.id, dependencies)
             self.refresh_view()
         
         self._force_close_dependency_dialog()
@@ -415,12 +395,30 @@ class TaskController:
 class ApplicationController:
     """Главный контроллер приложения"""
 
+    # Сколько задач показать до окончания чтения файла при запуске
+    STARTUP_FIRST_BATCH = 200
+    STARTUP_POLL_MS = 50
+    JOB_POLL_MS = 100
+
     def __init__(self, parent):
         self.parent = parent
+        self.journal: Optional[ChangeJournal] = None
+        # Открытая база SQLite, в которую пишутся изменения, или None (JSON файл)
+        self.database: Optional[SQLiteStorage] = None
+        # Идет ли фоновая дозагрузка файла при запуске
+        self.startup_loading = False
+        # Фоновая операция (экспорт, импорт): поток, отмена, очередь результатов
+        self._job_thread: Optional[threading.Thread] = None
+        self._job_cancel: Optional[threading.Event] = None
+        self._job_queue: Optional[queue.Queue] = None
+        self._job_on_done: Optional[Callable] = None
+        self._job_title = ""
 
         self.task_manager = TaskManager()
         self.storage = DataStorage()
-        self.auto_save_manager = AutoSaveManager(self.task_manager, self.storage)
+        self.auto_save_manager = AutoSaveManager(
+            self.task_manager, self.storage, on_flush=self._on_autosave_flush
+        )
 
         self._create_views()
 
@@ -442,7 +440,6 @@ class ApplicationController:
         )
         
         self._load_data_on_startup()
-        self.auto_save_manager.start(self.parent)
 
     def _create_views(self):
         """Создать представления"""
@@ -452,7 +449,13 @@ class ApplicationController:
             on_save=self.save_data,
             on_load=self.load_data,
             on_export=self.export_to_excel,
-            on_exit=self.on_exit
+            on_exit=self.on_exit,
+            on_export_gantt=lambda: self.export_to_excel(gantt="auto"),
+            on_export_partitioned=self.export_partitioned,
+            on_export_data=self.export_data,
+            on_import=self.import_tasks,
+            on_migrate_sqlite=self.migrate_to_sqlite,
+            on_export_sqlite_json=self.export_database_to_json
         )
         
         self.header_view = HeaderView(self.parent)
@@ -481,6 +484,7 @@ class ApplicationController:
         )
 
         self.notification_view = NotificationView(self.parent)
+        self.progress_view = ProgressView(self.parent)
 
     def _on_filter_change(self):
         """Обработка изменения фильтров"""
@@ -488,19 +492,155 @@ class ApplicationController:
         self.task_controller.set_filters(filters)
 
     def _load_data_on_startup(self):
-        """Загрузить данные при запуске"""
-        if self.storage.file_exists():
-            tasks = self.storage.load_tasks()
-            if tasks:
-                for task in tasks:
-                    self.task_manager.add_task(task)
-                self.refresh()
-                self.notification_view.show(f"✅ Загружено задач: {len(tasks)}")
+        """
+        Загрузить данные при запуске
+
+        Первые STARTUP_FIRST_BATCH задач читаются сразу и показываются в
+        таблице, остальная часть файла дочитывается в фоновом потоке.
+        """
+        if not self.storage.file_exists():
+            self._finish_startup()
+            return
+
+        meta = {}
+        stream = self.storage.stream_tasks(meta=meta)
+        try:
+            first_tasks = list(islice(stream, self.STARTUP_FIRST_BATCH))
+        except Exception as e:
+            # Основного файла нет или он поврежден в начале
+            print(f"Ошибка при загрузке: {e}")
+            self._load_full_on_startup()
+            return
+
+        duplicates = self.task_manager.bulk_load(first_tasks)
+        self.task_manager.mark_saved()
+        self.refresh()
+
+        # Правки до конца загрузки не попали бы ни в журнал, ни в файл
+        self.startup_loading = True
+        self.task_controller.editing_locked = True
+        results = queue.Queue()
+        threading.Thread(
+            target=self._read_rest_on_startup, args=(stream, results), daemon=True
+        ).start()
+        self.parent.after(self.STARTUP_POLL_MS, self._poll_startup_load,
+                          len(first_tasks), duplicates, meta, results)
+
+    @staticmethod
+    def _read_rest_on_startup(stream, results: queue.Queue):
+        """Фоновый поток: дочитать задачи из файла"""
+        try:
+            results.put((list(stream), None))
+        except Exception as e:
+            results.put((None, e))
+
+    def _poll_startup_load(self, first_count: int, duplicates: list, meta: dict,
+                           results: queue.Queue):
+        """Дождаться окончания фоновой загрузки (поток Tk)"""
+        try:
+            rest, error = results.get_nowait()
+        except queue.Empty:
+            self.parent.after(self.STARTUP_POLL_MS, self._poll_startup_load,
+                              first_count, duplicates, meta, results)
+            return
+
+        self.startup_loading = False
+        self.task_controller.editing_locked = False
+        if error is not None:
+            print(f"Ошибка при загрузке: {error}")
+            self._load_full_on_startup()
+            return
+
+        # Первая порция уже в менеджере: повторы в остатке тоже пропустятся
+        duplicates = duplicates + self.task_manager.bulk_load(rest)
+        self.storage.format_version = meta.get("version", "1.0")
+        replayed = self.storage.replay_journal_into(
+            self.task_manager, meta.get("journal_seq", 0)
+        )
+        if not replayed:
+            self.task_manager.mark_saved()
+        self.refresh()
+        self._show_load_result(first_count + len(rest), duplicates)
+        self._show_recovery_result()
+        self._finish_startup()
+
+    def _load_full_on_startup(self):
+        """Загрузить файл целиком (с восстановлением из предыдущих версий)"""
+        tasks = self.storage.load_tasks()
+        if tasks:
+            duplicates = self.task_manager.replace_all(tasks)
+            if self.storage.recovered_from is None and not self.storage.replayed_records:
+                self.task_manager.mark_saved()
+            self.refresh()
+            self._show_load_result(len(tasks), duplicates)
+            self._show_recovery_result()
+        self._finish_startup()
+
+    def _show_recovery_result(self):
+        """Сообщить о примененном журнале и восстановлении из версии"""
+        if self.storage.replayed_records:
+            self.notification_view.show(
+                f"↩️ Восстановлено несохраненных изменений: "
+                f"{self.storage.replayed_records}",
+                duration=4000
+            )
+        # Разрыв журнала: изменения после загруженного снимка потеряны
+        lost = (" Изменения после этой версии восстановить не удалось: "
+                "журнал изменений неполный." if self.storage.journal_gap else "")
+        if self.storage.recovered_from is not None:
+            self.notification_view.show(
+                f"⚠️ Основной файл поврежден, данные восстановлены из "
+                f"{self.storage.recovered_from.name}.{lost}",
+                duration=8000 if lost else 5000
+            )
+        elif lost:
+            self.notification_view.show(f"⚠️{lost}", duration=8000)
+
+    def _finish_startup(self):
+        """Подключить журнал и автосохранение после загрузки"""
+        # Журнал подключается после загрузки: сама загрузка в него не пишется
+        self.journal = ChangeJournal(self.storage, self.task_manager)
+        self.auto_save_manager.start(self.parent)
+
+    def _show_load_result(self, count: int, duplicates: list):
+        """Показать результат загрузки с учетом пропущенных дубликатов"""
+        if duplicates:
+            shown = ", ".join(duplicates[:5])
+            if len(duplicates) > 5:
+                shown += f" и еще {len(duplicates) - 5}"
+            self.notification_view.show(
+                f"⚠️ Загружено задач: {count - len(duplicates)}, "
+                f"пропущены повторяющиеся ID: {shown}",
+                duration=4000
+            )
+        else:
+            self.notification_view.show(f"✅ Загружено задач: {count}")
+
+    def _on_autosave_flush(self, success: bool, elapsed: float, size: int):
+        """Сообщить о завершении фонового автосохранения"""
+        if success and self.database is not None:
+            self.notification_view.show(
+                f"💾 Автосохранение в базу: строк {size} за {elapsed:.2f} с"
+            )
+        elif success:
+            self.notification_view.show(
+                f"💾 Автосохранение: {size / 1024:.0f} КБ за {elapsed:.2f} с"
+            )
+        else:
+            self.notification_view.show("❌ Ошибка автосохранения")
+
+    def _check_not_loading(self) -> bool:
+        """Предупредить, если файл проекта еще загружается"""
+        if self.startup_loading:
+            self.notification_view.show("⏳ Дождитесь окончания загрузки проекта")
+            return False
+        return True
 
     def save_data(self):
         """Сохранить данные"""
-        tasks = self.task_manager.get_all_tasks()
-        if self.storage.save_tasks(tasks):
+        if not self._check_not_loading():
+            return
+        if self.auto_save_manager.save_now():
             self.notification_view.show("✅ Данные сохранены")
         else:
             self.notification_view.show("❌ Ошибка при сохранении данных")
@@ -508,10 +648,14 @@ class ApplicationController:
     def load_data(self):
         """Загрузить данные из файла"""
         from tkinter import filedialog
+
+        if not self._check_not_loading():
+            return
         
         filename = filedialog.askopenfilename(
             title="Загрузить проект",
-            filetypes=[("JSON файлы", "*.json"), ("Все файлы", "*.*")],
+            filetypes=[("JSON файлы", "*.json"), ("База SQLite", "*.db"),
+                       ("Бинарный проект", "*.prjb"), ("Все файлы", "*.*")],
             defaultextension=".json"
         )
         
@@ -519,51 +663,383 @@ class ApplicationController:
             return
         
         try:
-            storage = DataStorage(filename)
+            storage = open_storage(filename)
             tasks = storage.load_tasks()
             
             if tasks:
-                self.task_manager.clear_all()
-                
-                for task in tasks:
-                    self.task_manager.add_task(task)
-                
+                if isinstance(storage, SQLiteStorage):
+                    duplicates = self._open_database(storage, tasks)
+                else:
+                    self._close_database()
+                    duplicates = self.task_manager.replace_all(tasks)
                 self.refresh()
-                self.notification_view.show(f"✅ Загружено задач: {len(tasks)}")
+                self._show_load_result(len(tasks), duplicates)
             else:
                 self.notification_view.show("⚠️ Файл пуст или поврежден")
         except Exception as e:
             self.notification_view.show(f"❌ Ошибка загрузки: {str(e)}")
 
-    def export_to_excel(self):
-        """Экспортировать данные в Excel"""
+    def _open_database(self, database: SQLiteStorage, tasks: list) -> list:
+        """
+        Загрузить задачи из базы SQLite и сделать ее хранилищем проекта
+
+        Изменения записываются в базу построчно, фильтры выполняются
+        запросами к ней. Несохраненные правки JSON проекта остаются в его
+        журнале изменений.
+
+        Returns:
+            list: пропущенные повторяющиеся ID
+        """
+        self._close_database()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        duplicates = self.task_manager.replace_all(tasks)
+        database.attach(self.task_manager)
+        self.auto_save_manager.set_storage(database)
+        self.task_controller.filter_index.storage = database
+        self.database = database
+        self.task_manager.mark_saved()
+        return duplicates
+
+    def _close_database(self):
+        """Записать изменения в открытую базу и вернуться к JSON файлу проекта"""
+        if self.database is None:
+            return
+        if self.task_manager.is_dirty and not self.auto_save_manager.save_now():
+            self.notification_view.show("❌ Ошибка при сохранении в базу SQLite")
+        self.database.detach()
+        self.task_controller.filter_index.storage = None
+        self.auto_save_manager.set_storage(self.storage)
+        self.database = None
+        self.journal = ChangeJournal(self.storage, self.task_manager)
+
+    def migrate_to_sqlite(self):
+        """Перенести JSON проект в базу SQLite и продолжить работу с ней"""
         from tkinter import filedialog
-        
-        tasks = self.task_manager.get_all_tasks()
-        
-        if not tasks:
-            self.notification_view.show("⚠️ Нет задач для экспорта")
+
+        if not self._check_not_loading():
+            return
+        if self.database is not None:
+            self.notification_view.show("⚠️ Проект уже хранится в базе SQLite")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            title="Перенести проект в SQLite",
+            defaultextension=".db",
+            filetypes=[("База SQLite", "*.db"), ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+
+        # Переносится файл проекта: сначала записываем несохраненные правки
+        if self.task_manager.is_dirty and not self.auto_save_manager.save_now():
+            self.notification_view.show("❌ Ошибка при сохранении данных")
+            return
+        success, message = migrate_json_to_sqlite(str(self.storage.filepath), filename)
+        if not success:
+            self.notification_view.show(f"❌ {message}")
+            return
+
+        database = SQLiteStorage(filename)
+        tasks = database.load_tasks()
+        if tasks is None:
+            self.notification_view.show(f"❌ Не удалось прочитать базу: {filename}")
+            return
+        self._open_database(database, tasks)
+        self.refresh()
+        self.notification_view.show(f"✅ {message}. Изменения сохраняются в {filename}")
+
+    def export_database_to_json(self):
+        """Выгрузить открытую базу SQLite в JSON файл"""
+        from tkinter import filedialog
+
+        if self.database is None:
+            self.notification_view.show("⚠️ Сначала откройте базу SQLite (.db)")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            title="Выгрузить базу в JSON",
+            defaultextension=".json",
+            filetypes=[("JSON файлы", "*.json"), ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+
+        if self.task_manager.is_dirty and not self.auto_save_manager.save_now():
+            self.notification_view.show("❌ Ошибка при сохранении в базу SQLite")
+            return
+        success, message = export_sqlite_to_json(str(self.database.filepath), filename)
+        if success:
+            self.notification_view.show(f"✅ {message}: {filename}")
+        else:
+            self.notification_view.show(f"❌ {message}")
+
+    def export_to_excel(self, gantt: Optional[str] = None):
+        """
+        Экспортировать данные в Excel
+
+        Файл пишется в фоновом потоке из снимка задач и расписания,
+        поэтому интерфейс остается отзывчивым, а правки во время экспорта
+        в файл не попадают. Прогресс показывается в ProgressView.
+        gantt добавляет лист диаграммы Гантта (см. ExcelExporter).
+        """
+        if not self._can_start_export():
+            return
+        filename = self._ask_export_filename()
+        if not filename:
+            return
+        self._start_export(
+            partial(ExcelExporter.export_to_excel, filename=filename, gantt=gantt),
+            total=len(self.task_manager) * (2 if gantt else 1)
+        )
+
+    def export_partitioned(self):
+        """Экспортировать задачи по разделам WBS: листы или отдельные файлы"""
+        if not self._can_start_export():
+            return
+        DialogFactory.create_partition_export_dialog(
+            self.parent, self._on_partition_export_confirm
+        )
+
+    def _on_partition_export_confirm(self, depth: int, per_file: bool):
+        """Запустить экспорт по разделам с выбранными параметрами"""
+        if not self._can_start_export():
+            return
+        filename = self._ask_export_filename()
+        if not filename:
+            return
+        self._start_export(
+            partial(ExcelExporter.export_partitioned, filename=filename,
+                    depth=depth, per_file=per_file),
+            total=len(self.task_manager)
+        )
+
+    def export_data(self):
+        """Экспортировать задачи без оформления: CSV, Parquet, Arrow"""
+        from tkinter import filedialog
+
+        if not self._can_start_export():
             return
-        
         filename = filedialog.asksaveasfilename(
+            title="Экспорт данных",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet"),
+                       ("Arrow IPC", "*.arrow"), ("Столбцовый JSON", "*.json"),
+                       ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+
+        exporter = CsvExporter if filename.lower().endswith(".csv") else ColumnarExporter
+
+        def export(tasks, schedule, progress, cancel_event):
+            return exporter.export(tasks, filename, progress, cancel_event)
+
+        self._start_export(export, total=len(self.task_manager), title="Экспорт данных")
+
+    def import_tasks(self):
+        """
+        Импортировать задачи из Excel или CSV
+
+        Файл читается и проверяется в фоновом потоке. Если в строках есть
+        ошибки, они показываются списком и проект не меняется; иначе
+        задачи заменяют текущий проект, как при открытии файла.
+        """
+        from tkinter import filedialog
+
+        if not self._can_start_job():
+            return
+        filename = filedialog.askopenfilename(
+            title="Импорт задач",
+            filetypes=[("Excel и CSV", "*.xlsx *.csv"), ("Excel файлы", "*.xlsx"),
+                       ("CSV", "*.csv"), ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+
+        def job(progress, cancel_event):
+            try:
+                return TaskImporter.read(filename, progress, cancel_event)
+            except ImportCancelled:
+                return None
+
+        self._start_job(job, 0, "Импорт", self._finish_import)
+
+    def _finish_import(self, result: Optional[ImportResult]):
+        """Загрузить прочитанные задачи или показать ошибки"""
+        if result is None:
+            self.notification_view.show("⚠️ Импорт отменен")
+            return
+        if result.errors:
+            DialogFactory.create_import_errors_dialog(self.parent, result.errors)
+            return
+        if not result.tasks:
+            self.notification_view.show("⚠️ В файле нет задач")
+            return
+
+        self.task_manager.replace_all(result.tasks)
+        self.refresh()
+        self.notification_view.show(f"✅ Импортировано задач: {len(result.tasks)}")
+
+    def _can_start_job(self) -> bool:
+        """Проверить, что можно начать фоновую операцию"""
+        if not self._check_not_loading():
+            return False
+        if self._job_thread is not None:
+            self.notification_view.show("⏳ Дождитесь окончания текущей операции")
+            return False
+        return True
+
+    def _can_start_export(self) -> bool:
+        """Проверить, что экспорт можно начать"""
+        if not self._can_start_job():
+            return False
+        if not len(self.task_manager):
+            self.notification_view.show("⚠️ Нет задач для экспорта")
+            return False
+        return True
+
+    @staticmethod
+    def _ask_export_filename() -> str:
+        """Спросить имя файла экспорта"""
+        from tkinter import filedialog
+
+        return filedialog.asksaveasfilename(
             title="Экспорт в Excel",
             defaultextension=".xlsx",
             filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")]
         )
-        
-        if not filename:
-            return
-        
-        success, message = ExcelExporter.export_to_excel(tasks, filename)
-        
+
+    def _start_export(self, export, total: int, title: str = "Экспорт в Excel"):
+        """
+        Запустить экспорт в фоновом потоке
+
+        export вызывается как export(tasks, schedule=..., progress=...,
+        cancel_event=...) и возвращает (success, message).
+        """
+        # Снимок: TaskManager при правках (update_task, set_dependencies)
+        # ставит на место задачи новый объект, а не меняет прежний
+        tasks = tuple(self.task_manager.get_all_tasks())
+        schedule = self.task_controller.scheduler.snapshot()
+
+        def job(progress, cancel_event):
+            return export(tasks, schedule=schedule, progress=progress,
+                          cancel_event=cancel_event)
+
+        self._start_job(job, total, title, self._show_export_result)
+
+    def _show_export_result(self, outcome: tuple):
+        """Сообщить о результате экспорта"""
+        success, message = outcome
         if success:
             self.notification_view.show("✅ " + message, duration=3000)
+        elif self._job_cancel_requested:
+            self.notification_view.show("⚠️ " + message)
         else:
             self.notification_view.show("❌ " + message, duration=3000)
 
+    def _start_job(self, job: Callable, total: int, title: str, on_done: Callable):
+        """
+        Запустить фоновую операцию с прогрессом и отменой
+
+        job(progress, cancel_event) выполняется в фоновом потоке и не
+        должен обращаться к интерфейсу и TaskManager; его результат
+        передается в on_done в потоке интерфейса.
+        """
+        self._job_cancel = threading.Event()
+        self._job_queue = queue.Queue()
+        self._job_on_done = on_done
+        self._job_title = title
+        self._job_thread = threading.Thread(
+            target=self._run_job,
+            args=(job, self._job_cancel, self._job_queue),
+            daemon=True
+        )
+        self.progress_view.show(title, on_cancel=self._cancel_job)
+        self.progress_view.update(0, total)
+        self._job_thread.start()
+        self.parent.after(self.JOB_POLL_MS, self._poll_job)
+
+    @staticmethod
+    def _run_job(job: Callable, cancel_event: threading.Event, results: queue.Queue):
+        """Выполнить операцию в фоновом потоке"""
+        try:
+            outcome = job(
+                lambda done, total: results.put(("progress", done, total)),
+                cancel_event
+            )
+        except Exception as e:
+            # Без итогового сообщения интерфейс ждал бы завершения вечно
+            results.put(("failed", str(e)))
+            return
+        results.put(("done", outcome))
+
+    def _poll_job(self):
+        """Перенести прогресс и результат фоновой операции в интерфейс"""
+        if self._job_queue is None:
+            return
+        progress = None
+        finished = False
+        outcome = None
+        error = None
+        try:
+            while True:
+                item = self._job_queue.get_nowait()
+                if item[0] == "progress":
+                    progress = item[1:]
+                elif item[0] == "failed":
+                    finished, error = True, item[1]
+                else:
+                    finished, outcome = True, item[1]
+        except queue.Empty:
+            pass
+
+        if not finished:
+            if progress is not None and not self._job_cancel.is_set():
+                done, total = progress
+                if total and done >= total:
+                    self.progress_view.update(done, total, f"{self._job_title}: завершение...")
+                else:
+                    self.progress_view.update(done, total)
+            self.parent.after(self.JOB_POLL_MS, self._poll_job)
+            return
+
+        on_done = self._job_on_done
+        title = self._job_title
+        self._finish_job()
+        if error is not None:
+            self.notification_view.show(f"❌ {title}: ошибка: {error}", duration=4000)
+            return
+        on_done(outcome)
+
+    @property
+    def _job_cancel_requested(self) -> bool:
+        """Была ли запрошена отмена текущей операции"""
+        return self._job_cancel is not None and self._job_cancel.is_set()
+
+    def _cancel_job(self):
+        """Отменить фоновую операцию"""
+        if self._job_cancel is not None:
+            self._job_cancel.set()
+            self.progress_view.set_cancelling()
+
+    def _finish_job(self):
+        """Сбросить состояние фоновой операции"""
+        self.progress_view.close()
+        self._job_thread = None
+        self._job_queue = None
+        self._job_on_done = None
+
     def on_exit(self):
         """Обработка выхода из приложения"""
-        self.auto_save_manager.save_now()
+        # Во время загрузки в памяти только часть файла - не перезаписываем его
+        if self.task_manager.is_dirty and not self.startup_loading:
+            self.auto_save_manager.save_now()
+        # Недописанный экспорт прерываем, пока файл еще не начал записываться
+        if self._job_thread is not None:
+            self._cancel_job()
+            self._job_thread.join()
         self.auto_save_manager.stop()
         self.parent.quit()
 
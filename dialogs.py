@@ -2,10 +2,12 @@
 Диалоговые окна приложения - паттерн Factory
 """
 import customtkinter as ctk
-from datetime import datetime
+from tkinter import ttk
+from datetime import date, datetime
 from tkcalendar import DateEntry
-from typing import Callable, Optional, List
-from models import Task
+from typing import Callable, Dict, Optional, List, Set
+from models import Task, TaskManager, parse_date_ordinal
+from storage import wbs_prefix
 
 
 class DialogFactory:
@@ -27,10 +29,22 @@ class DialogFactory:
         return DeleteConfirmationDialog(parent, task, on_confirm)
 
     @staticmethod
-    def create_dependency_dialog(parent, task: Task, available_tasks: List[Task],
-                                on_save: Callable, on_cancel: Callable = None):
+    def create_dependency_dialog(parent, task: Task, task_manager: TaskManager,
+                                on_save: Callable, on_cancel: Callable = None,
+                                search_index=None):
         """Создать диалог выбора зависимостей"""
-        return DependencyDialog(parent, task, available_tasks, on_save, on_cancel)
+        return DependencyDialog(parent, task, task_manager, on_save, on_cancel,
+                                search_index)
+
+    @staticmethod
+    def create_partition_export_dialog(parent, on_confirm: Callable):
+        """Создать диалог параметров экспорта по разделам WBS"""
+        return PartitionExportDialog(parent, on_confirm)
+
+    @staticmethod
+    def create_import_errors_dialog(parent, errors: List[str]):
+        """Создать окно со списком ошибок импорта"""
+        return ImportErrorsDialog(parent, errors)
 
 
 class BaseDialog(ctk.CTkToplevel):
@@ -192,11 +206,9 @@ class TaskDialog(BaseDialog):
         date_frame.pack_propagate(False)
 
         # Парсинг даты
-        if date_str:
-            try:
-                date_obj = datetime.strptime(date_str, "%d.%m.%Y")
-            except:
-                date_obj = datetime.now()
+        ordinal = parse_date_ordinal(date_str) if date_str else None
+        if ordinal is not None:
+            date_obj = date.fromordinal(ordinal)
         else:
             date_obj = datetime.now()
 
@@ -217,14 +229,10 @@ class TaskDialog(BaseDialog):
 
     def _update_duration(self, *args):
         """Обновить длительность"""
-        start = self.date_start.get_date().strftime("%d.%m.%Y")
-        end = self.date_end.get_date().strftime("%d.%m.%Y")
-
         try:
-            start_dt = datetime.strptime(start, "%d.%m.%Y")
-            end_dt = datetime.strptime(end, "%d.%m.%Y")
-            duration = (end_dt - start_dt).days + 1
-            duration = max(0, duration)
+            start = self.date_start.get_date()
+            end = self.date_end.get_date()
+            duration = max(0, (end - start).days + 1)
         except:
             duration = 0
 
@@ -403,21 +411,47 @@ class DeleteConfirmationDialog(BaseDialog):
 
 
 class DependencyDialog(BaseDialog):
-    """Диалог выбора зависимостей"""
-
-    def __init__(self, parent, task: Task, available_tasks: List[Task],
-                 on_save: Callable, on_cancel: Callable = None):
+    """
+    Диалог выбора зависимостей
+
+    Список задач виртуальный: в Treeview живут только видимые строки,
+    которые переиспользуются при прокрутке, а задачи берутся из
+    TaskManager по позиции. Поиск идет по индексу TaskFilterIndex после
+    паузы в наборе, поэтому открытие диалога не зависит от размера проекта.
+    """
+
+    ROW_HEIGHT = 28
+    OVERSCAN = 2
+    VISIBLE_ROWS = 10
+    SEARCH_DELAY_MS = 250
+    CHECKED = "☑"
+    UNCHECKED = "☐"
+
+    def __init__(self, parent, task: Task, task_manager: TaskManager,
+                 on_save: Callable, on_cancel: Callable = None,
+                 search_index=None):
         # Инициализируем атрибуты ДО вызова super().__init__
         self.task = task
-        self.available_tasks = available_tasks
+        self.task_manager = task_manager
+        self.search_index = search_index
         self.on_save_callback = on_save
         self.on_cancel_callback = on_cancel
-        self.checkbox_vars = {}
         self.is_closed = False
-        
+        # Выбранные зависимости храним по ID: метки собираются при сохранении
+        self.selected_ids: Set[str] = set(task.dependency_ids())
+        # Позиция самой задачи в TaskManager - она не показывается в списке
+        self._excluded = task_manager.index_of(task.id)
+        # Отфильтрованный список или None - все задачи TaskManager
+        self._rows: Optional[List[Task]] = None
+        self._offset = 0
+        self._pool: List[str] = []
+        self._pool_tasks: Dict[str, Task] = {}
+        self._search_job = None
+        self._last_search = ""
+
         # Вызываем базовый конструктор
-        super().__init__(parent, "Выбор зависимостей", 380, 400)
-        
+        super().__init__(parent, "Выбор зависимостей", 420, 500)
+
         # Создаем содержимое
         self.create_content()
 
@@ -436,55 +470,78 @@ class DependencyDialog(BaseDialog):
             text=f"Выберите задачи, от которых зависит:\n{self.task.id} - {self.task.object}",
             font=ctk.CTkFont(size=11),
             text_color="gray",
-            wraplength=340
+            wraplength=380
         )
-        info_label.pack(pady=(0, 15))
+        info_label.pack(pady=(0, 10))
+
+        # Поиск и режим "только выбранные"
+        search_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        search_frame.pack(fill="x", pady=(0, 8))
+
+        self.search_entry = ctk.CTkEntry(
+            search_frame,
+            placeholder_text="🔍 Поиск по ID или объекту...",
+            height=30,
+            font=ctk.CTkFont(size=12)
+        )
+        self.search_entry.pack(side="left", fill="x", expand=True)
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
+
+        self.only_selected_var = ctk.BooleanVar(value=False)
+        only_selected = ctk.CTkCheckBox(
+            search_frame,
+            text="Только выбранные",
+            variable=self.only_selected_var,
+            command=self._apply_filter,
+            font=ctk.CTkFont(size=11)
+        )
+        only_selected.pack(side="left", padx=(10, 0))
 
         # Список задач
-        scroll_frame = ctk.CTkScrollableFrame(
-            self.content,
-            width=340,
-            height=220,
-            fg_color="#f8f9fa",
-            corner_radius=8
-        )
-        scroll_frame.pack(fill="both", expand=True, pady=(0, 10))
-
-        if not self.available_tasks:
-            no_tasks_label = ctk.CTkLabel(
-                scroll_frame,
-                text="Нет доступных задач для зависимостей",
-                font=ctk.CTkFont(size=12),
-                text_color="gray"
-            )
-            no_tasks_label.pack(pady=20)
-        else:
-            for task in self.available_tasks:
-                task_label = f"{task.id} - {task.object}"
-                is_selected = task_label in self.task.dependencies
+        list_frame = ctk.CTkFrame(self.content, fg_color="#f8f9fa", corner_radius=8)
+        list_frame.pack(fill="both", expand=True)
+
+        style = ttk.Style()
+        style.configure("Dependency.Treeview",
+                        background="white",
+                        fieldbackground="white",
+                        rowheight=self.ROW_HEIGHT,
+                        borderwidth=0,
+                        font=('Segoe UI', 10))
+
+        self.scrollbar = ttk.Scrollbar(list_frame, command=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree = ttk.Treeview(
+            list_frame,
+            columns=("check", "task"),
+            show="",
+            height=self.VISIBLE_ROWS,
+            selectmode="none",
+            style="Dependency.Treeview"
+        )
+        self.tree.column("check", width=30, anchor="center", stretch=False)
+        self.tree.column("task", width=330, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=(8, 0), pady=8)
 
-                checkbox_var = ctk.BooleanVar(value=is_selected)
-                self.checkbox_vars[task_label] = checkbox_var
+        self.tree.bind('<Button-1>', self._on_click)
+        self.tree.bind('<Configure>', lambda e: self._render_window())
+        self.tree.bind('<MouseWheel>', self._on_mouse_wheel)
+        self.tree.bind('<Button-4>', self._on_mouse_wheel)
+        self.tree.bind('<Button-5>', self._on_mouse_wheel)
 
-                task_frame = ctk.CTkFrame(
-                    scroll_frame,
-                    fg_color="white",
-                    corner_radius=6
-                )
-                task_frame.pack(fill="x", padx=8, pady=4)
-
-                checkbox = ctk.CTkCheckBox(
-                    task_frame,
-                    text=task_label,
-                    variable=checkbox_var,
-                    font=ctk.CTkFont(size=12),
-                    fg_color="#3B8ED0",
-                    hover_color="#2E7AB8"
-                )
-                checkbox.pack(anchor="w", padx=12, pady=10)
+        self.status_label = ctk.CTkLabel(
+            self.content,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+            anchor="w"
+        )
+        self.status_label.pack(fill="x", pady=(6, 0))
 
         # Кнопки
         self._create_buttons()
+        self._render_window()
 
     def _create_buttons(self):
         """Создать кнопки"""
@@ -513,6 +570,177 @@ class DependencyDialog(BaseDialog):
         )
         save_btn.pack(side="right", padx=(0, 10))
 
+    # Источник строк
+
+    def _row_count(self) -> int:
+        """Число строк в текущем списке"""
+        if self._rows is not None:
+            return len(self._rows)
+        return len(self.task_manager) - (self._excluded is not None)
+
+    def _row_task(self, row: int) -> Task:
+        """Задача строки текущего списка"""
+        if self._rows is not None:
+            return self._rows[row]
+        if self._excluded is not None and row >= self._excluded:
+            row += 1
+        return self.task_manager.get_task_by_index(row)
+
+    def _search_ids(self, text: str) -> Set[str]:
+        """ID задач, содержащих text в ID или объекте"""
+        if self.search_index is not None:
+            return self.search_index.query({'search': text}) or set()
+        return {task.id for task in self.task_manager.iter_tasks()
+                if text in f"{task.id.lower()}\x00{task.object.lower()}"}
+
+    def _apply_filter(self):
+        """Пересобрать список по строке поиска и режиму отображения"""
+        text = self._last_search.strip().lower()
+        only_selected = self.only_selected_var.get()
+        if not text and not only_selected:
+            self._rows = None
+        else:
+            ids = self._search_ids(text) if text else set(self.selected_ids)
+            if only_selected:
+                ids &= self.selected_ids
+            ids.discard(self.task.id)
+            index_of = self.task_manager.index_of
+            positions = sorted(pos for pos in map(index_of, ids) if pos is not None)
+            get_task = self.task_manager.get_task_by_index
+            self._rows = [get_task(pos) for pos in positions]
+        self._offset = 0
+        self._render_window()
+
+    def _on_search_key(self, event=None):
+        """Отложить поиск до паузы в наборе текста"""
+        text = self.search_entry.get()
+        if text == self._last_search:
+            return
+        self._last_search = text
+        self._cancel_search_job()
+        self._search_job = self.after(self.SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        """Применить поиск после паузы в наборе"""
+        self._search_job = None
+        self._apply_filter()
+
+    def _cancel_search_job(self):
+        """Отменить отложенный поиск"""
+        if self._search_job is not None:
+            try:
+                self.after_cancel(self._search_job)
+            except Exception:
+                pass
+            self._search_job = None
+
+    # Отрисовка и прокрутка
+
+    def _visible_rows(self) -> int:
+        """Число строк, помещающихся в видимой области"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return self.VISIBLE_ROWS
+        return max(1, height // self.ROW_HEIGHT)
+
+    def _render_window(self):
+        """Отрисовать видимое окно списка в строках пула"""
+        count = self._row_count()
+        visible = self._visible_rows()
+        size = visible + self.OVERSCAN
+        self._offset = max(0, min(self._offset, count - visible))
+
+        while len(self._pool) < size:
+            iid = f"__row_{len(self._pool)}"
+            self.tree.insert("", "end", iid=iid, values=())
+            self._pool.append(iid)
+        while len(self._pool) > size:
+            self.tree.delete(self._pool.pop())
+
+        self._pool_tasks = {}
+        for k, iid in enumerate(self._pool):
+            row = self._offset + k
+            if row < count:
+                task = self._row_task(row)
+                self._pool_tasks[iid] = task
+                values = (self._mark(task), f"{task.id} - {task.object}")
+            else:
+                values = ()
+            self.tree.item(iid, values=values)
+        self.tree.yview_moveto(0)
+
+        if count:
+            self.scrollbar.set(self._offset / count,
+                               min(1.0, (self._offset + visible) / count))
+        else:
+            self.scrollbar.set(0, 1)
+        self._update_status(count)
+
+    def _mark(self, task: Task) -> str:
+        """Отметка выбора для строки"""
+        return self.CHECKED if task.id in self.selected_ids else self.UNCHECKED
+
+    def _update_status(self, count: int):
+        """Обновить строку состояния под списком"""
+        if count == 0 and self._rows is None:
+            text = "Нет доступных задач для зависимостей"
+        elif count == 0:
+            text = "Ничего не найдено"
+        else:
+            text = f"Показано: {count}  ·  Выбрано: {len(self.selected_ids)}"
+        self.status_label.configure(text=text)
+
+    def _scroll_to(self, offset: int):
+        """Сдвинуть окно на новое смещение"""
+        if offset != self._offset:
+            self._offset = offset
+            self._render_window()
+
+    def _on_scroll(self, *args):
+        """Команда полосы прокрутки"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self._row_count()))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= self._visible_rows()
+            self._scroll_to(self._offset + step)
+
+    def _on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши"""
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._scroll_to(self._offset + step)
+        return "break"
+
+    def _on_click(self, event):
+        """Переключить выбор задачи по щелчку на строке"""
+        task = self._pool_tasks.get(self.tree.identify_row(event.y))
+        if task is None:
+            return "break"
+        if task.id in self.selected_ids:
+            self.selected_ids.discard(task.id)
+        else:
+            self.selected_ids.add(task.id)
+        # Строка остается в списке "только выбранные" до следующего фильтра
+        self._render_window()
+        return "break"
+
+    def get_selected_dependencies(self) -> List[str]:
+        """Метки выбранных зависимостей в порядке задач"""
+        index_of = self.task_manager.index_of
+        positions = sorted(pos for pos in map(index_of, self.selected_ids)
+                           if pos is not None and pos != self._excluded)
+        get_task = self.task_manager.get_task_by_index
+        return [f"{task.id} - {task.object}"
+                for task in (get_task(pos) for pos in positions)]
+
     def cancel(self):
         """Отменить изменения"""
         print("DEBUG: DependencyDialog.cancel() вызван")
@@ -537,14 +765,11 @@ class DependencyDialog(BaseDialog):
             return
         self.is_closed = True
         
-        selected_deps = [
-            task_label for task_label, var in self.checkbox_vars.items()
-            if var.get()
-        ]
-        self.on_save_callback(selected_deps)
+        self.on_save_callback(self.get_selected_dependencies())
     
     def destroy(self):
         """Переопределение destroy для предотвращения повторного вызова"""
+        self._cancel_search_job()
         if not self.is_closed:
             self.is_closed = True
             if self.on_cancel_callback:
@@ -553,4 +778,145 @@ class DependencyDialog(BaseDialog):
         try:
             super().destroy()
         except:
-            pass
\ No newline at end of file
+            pass
+
+
+class PartitionExportDialog(BaseDialog):
+    """Диалог параметров экспорта по разделам WBS"""
+
+    DEPTHS = ["1", "2", "3", "4"]
+    DEFAULT_DEPTH = "2"
+    EXAMPLE_ID = "WBS-01-13-001"
+
+    def __init__(self, parent, on_confirm: Callable):
+        super().__init__(parent, "Экспорт по разделам WBS", 420, 270)
+        self.on_confirm_callback = on_confirm
+        self.create_content()
+        self.center_on_screen()
+        self.bind('<Escape>', lambda e: self.destroy())
+        self.bind('<Return>', lambda e: self.confirm())
+
+    def create_content(self):
+        """Создать содержимое"""
+        depth_label = ctk.CTkLabel(
+            self.content,
+            text="Глубина префикса ID (частей через дефис):",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            anchor="w"
+        )
+        depth_label.pack(fill="x", pady=(5, 5))
+
+        self.depth_combo = ctk.CTkComboBox(
+            self.content,
+            values=self.DEPTHS,
+            command=self._update_example,
+            state="readonly",
+            height=35
+        )
+        self.depth_combo.set(self.DEFAULT_DEPTH)
+        self.depth_combo.pack(fill="x")
+
+        self.example_label = ctk.CTkLabel(
+            self.content,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="gray",
+            anchor="w"
+        )
+        self.example_label.pack(fill="x", pady=(5, 10))
+        self._update_example()
+
+        self.per_file_var = ctk.BooleanVar(value=False)
+        per_file_check = ctk.CTkCheckBox(
+            self.content,
+            text="Каждый раздел в отдельный файл",
+            variable=self.per_file_var,
+            font=ctk.CTkFont(size=12)
+        )
+        per_file_check.pack(fill="x", pady=(0, 15))
+
+        button_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        button_frame.pack(fill="x", pady=(10, 0))
+
+        cancel_btn = ctk.CTkButton(
+            button_frame,
+            text="Отмена",
+            command=self.destroy,
+            fg_color="gray",
+            hover_color="#666666",
+            height=35,
+            width=100,
+            font=ctk.CTkFont(size=12)
+        )
+        cancel_btn.pack(side="right")
+
+        export_btn = ctk.CTkButton(
+            button_frame,
+            text="Экспорт",
+            command=self.confirm,
+            height=35,
+            width=100,
+            font=ctk.CTkFont(size=12)
+        )
+        export_btn.pack(side="right", padx=(0, 10))
+
+    def _update_example(self, *args):
+        """Показать пример раздела для выбранной глубины"""
+        depth = int(self.depth_combo.get())
+        self.example_label.configure(
+            text=f"Например: {self.EXAMPLE_ID} → {wbs_prefix(self.EXAMPLE_ID, depth)}"
+        )
+
+    def confirm(self):
+        """Подтвердить параметры"""
+        depth = int(self.depth_combo.get())
+        per_file = self.per_file_var.get()
+        self.destroy()
+        self.on_confirm_callback(depth, per_file)
+
+
+class ImportErrorsDialog(BaseDialog):
+    """Список ошибок импорта по строкам"""
+
+    # Больше строк текстовое поле показывает медленно
+    MAX_SHOWN = 1000
+
+    def __init__(self, parent, errors: List[str]):
+        super().__init__(parent, "Ошибки импорта", 640, 440)
+        self.errors = errors
+        self.create_content()
+        self.center_on_screen()
+        self.bind('<Escape>', lambda e: self.destroy())
+
+    def create_content(self):
+        """Создать содержимое"""
+        title_label = ctk.CTkLabel(
+            self.content,
+            text=f"Найдено ошибок: {len(self.errors)}. Задачи не загружены.",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            anchor="w"
+        )
+        title_label.pack(fill="x", pady=(0, 10))
+
+        lines = self.errors[:self.MAX_SHOWN]
+        if len(self.errors) > self.MAX_SHOWN:
+            lines.append(f"... и еще {len(self.errors) - self.MAX_SHOWN}")
+
+        textbox = ctk.CTkTextbox(
+            self.content,
+            font=ctk.CTkFont(size=12),
+            wrap="word"
+        )
+        textbox.pack(fill="both", expand=True)
+        textbox.insert("1.0", "\n".join(lines))
+        textbox.configure(state="disabled")
+
+        close_btn = ctk.CTkButton(
+            self.content,
+            text="Закрыть",
+            command=self.destroy,
+            height=35,
+            width=100,
+            font=ctk.CTkFont(size=12)
+        )
+        close_btn.pack(side="right", pady=(10, 0))
@@ -0,0 +1,186 @@
+"""
+Экспорт задач без оформления: CSV и столбцовые форматы для BI
+
+Поля берутся из Task.to_dict. Столбцовый экспорт пишет Parquet или
+Arrow IPC, если установлен pyarrow, иначе - столбцовый JSON
+(имя столбца -> список значений), который читается без pyarrow.
+"""
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from models import Task
+from storage import ExportCancelled
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+FIELDS = ("id", "object", "start_date", "end_date", "duration", "dependencies", "type")
+
+# Через сколько задач сообщать о прогрессе и проверять отмену
+PROGRESS_STEP = 5000
+
+
+def _report(done: int, total: int,
+            progress: Optional[Callable[[int, int], None]],
+            cancel_event: Optional[threading.Event]):
+    """Сообщить о прогрессе; ExportCancelled, если экспорт отменен"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExportCancelled()
+    if progress is not None:
+        progress(done, total)
+
+
+def _remove_quietly(path: str):
+    """Удалить файл, если он есть"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class CsvExporter:
+    """Экспорт задач в CSV потоковой записью"""
+
+    BUFFER_SIZE = 1 << 20
+    # Разделитель зависимостей внутри ячейки (ячейка берется в кавычки)
+    DEPENDENCY_SEPARATOR = "\n"
+
+    @staticmethod
+    def export(tasks: Iterable[Task], filename: str,
+               progress: Optional[Callable[[int, int], None]] = None,
+               cancel_event: Optional[threading.Event] = None) -> tuple[bool, str]:
+        """
+        Экспортировать задачи в CSV (UTF-8 с BOM, заголовок - имена полей)
+
+        Строки пишутся пачками через буфер BUFFER_SIZE во временный файл,
+        который заменяет filename только после успешной записи.
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        part_path = filename + ".part"
+        total = len(tasks) if hasattr(tasks, "__len__") else 0
+        try:
+            # BOM: без него Excel в Windows читает файл как cp1251
+            with open(part_path, "w", newline="", encoding="utf-8-sig",
+                      buffering=CsvExporter.BUFFER_SIZE) as f:
+                writer = csv.writer(f)
+                writer.writerow(FIELDS)
+                batch = []
+                count = 0
+                for task in tasks:
+                    data = task.to_dict()
+                    data["dependencies"] = CsvExporter.DEPENDENCY_SEPARATOR.join(
+                        data["dependencies"]
+                    )
+                    batch.append([data[name] for name in FIELDS])
+                    count += 1
+                    if len(batch) == PROGRESS_STEP:
+                        writer.writerows(batch)
+                        batch.clear()
+                        _report(count, total, progress, cancel_event)
+                writer.writerows(batch)
+            os.replace(part_path, filename)
+            _report(count, total or count, progress, None)
+            return True, f"Данные экспортированы в файл: {filename}"
+
+        except ExportCancelled:
+            _remove_quietly(part_path)
+            return False, "Экспорт отменен"
+        except Exception as e:
+            _remove_quietly(part_path)
+            return False, f"Ошибка при экспорте: {str(e)}"
+
+
+class ColumnarExporter:
+    """Столбцовый экспорт: Parquet, Arrow IPC или столбцовый JSON"""
+
+    PARQUET_SUFFIXES = (".parquet",)
+    ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+    FALLBACK_SUFFIX = ".columns.json"
+
+    @staticmethod
+    def export(tasks: Iterable[Task], filename: str,
+               progress: Optional[Callable[[int, int], None]] = None,
+               cancel_event: Optional[threading.Event] = None) -> tuple[bool, str]:
+        """
+        Экспортировать задачи в столбцовый формат по расширению filename
+
+        .parquet и .arrow/.feather/.ipc требуют pyarrow; без него
+        данные пишутся в <имя>.columns.json. Файл с любым другим
+        расширением тоже пишется как столбцовый JSON.
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        suffix = Path(filename).suffix.lower()
+        arrow_format = suffix in ColumnarExporter.PARQUET_SUFFIXES + ColumnarExporter.ARROW_SUFFIXES
+        note = ""
+        if arrow_format and pyarrow is None:
+            filename = str(Path(filename).with_suffix(ColumnarExporter.FALLBACK_SUFFIX))
+            note = " (pyarrow не установлен, записан столбцовый JSON)"
+            arrow_format = False
+
+        part_path = filename + ".part"
+        try:
+            columns = ColumnarExporter.columns(tasks, progress, cancel_event)
+            if not arrow_format:
+                ColumnarExporter._write_json(columns, part_path)
+            elif suffix in ColumnarExporter.PARQUET_SUFFIXES:
+                pyarrow.parquet.write_table(ColumnarExporter.to_arrow(columns), part_path)
+            else:
+                pyarrow.feather.write_feather(ColumnarExporter.to_arrow(columns), part_path)
+            os.replace(part_path, filename)
+            return True, f"Данные экспортированы в файл: {filename}{note}"
+
+        except ExportCancelled:
+            _remove_quietly(part_path)
+            return False, "Экспорт отменен"
+        except Exception as e:
+            _remove_quietly(part_path)
+            return False, f"Ошибка при экспорте: {str(e)}"
+
+    @staticmethod
+    def columns(tasks: Iterable[Task],
+                progress: Optional[Callable[[int, int], None]] = None,
+                cancel_event: Optional[threading.Event] = None) -> Dict[str, list]:
+        """Разложить задачи по столбцам (поля Task.to_dict) за один проход"""
+        columns: Dict[str, list] = {name: [] for name in FIELDS}
+        appenders = [(name, columns[name].append) for name in FIELDS]
+        total = len(tasks) if hasattr(tasks, "__len__") else 0
+        for count, task in enumerate(tasks):
+            if count % PROGRESS_STEP == 0:
+                _report(count, total, progress, cancel_event)
+            data = task.to_dict()
+            for name, append in appenders:
+                append(data[name])
+        return columns
+
+    @staticmethod
+    def to_arrow(columns: Dict[str, list]):
+        """Таблица pyarrow из столбцов"""
+        schema = pyarrow.schema([
+            ("id", pyarrow.string()),
+            ("object", pyarrow.string()),
+            ("start_date", pyarrow.string()),
+            ("end_date", pyarrow.string()),
+            ("duration", pyarrow.int32()),
+            ("dependencies", pyarrow.list_(pyarrow.string())),
+            ("type", pyarrow.string()),
+        ])
+        return pyarrow.table(columns, schema=schema)
+
+    @staticmethod
+    def _write_json(columns: Dict[str, List], path: str):
+        """Записать столбцовый JSON: {"num_rows": N, "columns": {...}}"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"num_rows": len(columns["id"]), "columns": columns},
+                      f, ensure_ascii=False, separators=(",", ":"))
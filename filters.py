@@ -0,0 +1,375 @@
+"""
+Индексированный поиск и фильтрация задач
+"""
+import queue
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+from models import Task, TaskManager, parse_date_ordinal
+
+
+# Длина n-граммы для индекса поиска
+NGRAM_SIZE = 3
+
+# Типы, которые считаются "Без типа"
+_UNTYPED = ("", "--")
+
+
+class _IndexedKeys(NamedTuple):
+    """Значения, под которыми задача лежит во вторичных индексах"""
+    type: str
+    dep_bucket: int
+    start: Optional[int]
+    end: Optional[int]
+    text: str
+
+
+def _search_text(task: Task) -> str:
+    """Текст задачи для поиска (ID и объект в нижнем регистре)"""
+    # Разделитель не дает найти подстроку на стыке ID и объекта
+    return f"{task.id.lower()}\x00{task.object.lower()}"
+
+
+def _ngrams(text: str) -> Set[str]:
+    """Множество n-грамм строки"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class TaskFilterIndex:
+    """
+    Вторичные индексы по задачам для FilterPanelView
+
+    Индексы: тип -> ID, число зависимостей (0/1/2+) -> ID, отсортированные
+    начала и окончания для пересечения с диапазоном дат и n-граммы по ID и
+    объекту для поиска. Обновляются инкрементально как наблюдатель
+    TaskManager; запрос пересекает множества кандидатов от меньшего к
+    большему. Запросы можно выполнять из фонового потока: изменения и
+    чтение индексов разделены блокировкой.
+
+    Если задано хранилище с методом query_ids (SQLiteStorage), запросы
+    выполняются в нем, пока все изменения записаны (TaskManager не
+    is_dirty); иначе - по индексам в памяти.
+    """
+
+    def __init__(self, task_manager: TaskManager):
+        self.task_manager = task_manager
+        self.storage = None
+        self._lock = threading.RLock()
+        self._reset(task_manager.iter_tasks())
+        task_manager.add_observer(self)
+
+    def _reset(self, tasks):
+        """Перестроить индексы с нуля"""
+        self._keys: Dict[str, _IndexedKeys] = {}
+        self._by_type: Dict[str, Set[str]] = {}
+        self._by_deps: Dict[int, Set[str]] = {0: set(), 1: set(), 2: set()}
+        self._ngrams: Dict[str, Set[str]] = {}
+        starts = []
+        ends = []
+        for task in tasks:
+            keys = self._index_keys(task)
+            if keys.start is not None and keys.end is not None:
+                starts.append((keys.start, task.id))
+                ends.append((keys.end, task.id))
+        starts.sort()
+        ends.sort()
+        self._starts: List[tuple] = starts
+        self._ends: List[tuple] = ends
+
+    def _index_keys(self, task: Task) -> _IndexedKeys:
+        """Добавить задачу во все индексы, кроме интервальных"""
+        keys = _IndexedKeys(
+            type=task.type or "",
+            dep_bucket=min(len(task.dependencies), 2),
+            start=task.start_ordinal,
+            end=task.end_ordinal,
+            text=_search_text(task)
+        )
+        self._keys[task.id] = keys
+        self._by_type.setdefault(keys.type, set()).add(task.id)
+        self._by_deps[keys.dep_bucket].add(task.id)
+        for gram in _ngrams(keys.text):
+            self._ngrams.setdefault(gram, set()).add(task.id)
+        return keys
+
+    def _add(self, task: Task):
+        """Добавить задачу во все индексы"""
+        keys = self._index_keys(task)
+        if keys.start is not None and keys.end is not None:
+            insort(self._starts, (keys.start, task.id))
+            insort(self._ends, (keys.end, task.id))
+
+    def _remove(self, task_id: str):
+        """Удалить задачу из всех индексов"""
+        keys = self._keys.pop(task_id, None)
+        if keys is None:
+            return
+        self._discard(self._by_type, keys.type, task_id)
+        self._by_deps[keys.dep_bucket].discard(task_id)
+        for gram in _ngrams(keys.text):
+            self._discard(self._ngrams, gram, task_id)
+        if keys.start is not None and keys.end is not None:
+            self._remove_sorted(self._starts, (keys.start, task_id))
+            self._remove_sorted(self._ends, (keys.end, task_id))
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, task_id: str):
+        """Удалить ID из множества и пустое множество из индекса"""
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(task_id)
+            if not ids:
+                del index[key]
+
+    @staticmethod
+    def _remove_sorted(items: List[tuple], item: tuple):
+        """Удалить элемент из отсортированного списка"""
+        pos = bisect_left(items, item)
+        if pos < len(items) and items[pos] == item:
+            del items[pos]
+
+    # Наблюдатель TaskManager
+
+    def on_task_added(self, task: Task):
+        with self._lock:
+            self._add(task)
+
+    def on_task_removed(self, task: Task):
+        with self._lock:
+            self._remove(task.id)
+
+    def on_task_updated(self, old_id: str, task: Task):
+        with self._lock:
+            self._remove(old_id)
+            self._add(task)
+
+    def on_tasks_reset(self, tasks: List[Task]):
+        with self._lock:
+            self._reset(tasks)
+
+    # Запросы
+
+    def query(self, filters: dict) -> Optional[Set[str]]:
+        """
+        Найти ID задач, удовлетворяющих фильтрам
+
+        Returns:
+            set: подходящие ID или None, если фильтры ничего не ограничивают
+        """
+        storage = self.storage
+        if storage is not None and not self.task_manager.is_dirty:
+            try:
+                return storage.query_ids(filters)
+            except Exception as e:
+                print(f"Ошибка запроса к базе: {e}")
+        with self._lock:
+            return self._query(filters)
+
+    def _query(self, filters: dict) -> Optional[Set[str]]:
+        """Выполнить запрос (вызывается под блокировкой)"""
+        candidates: List[Set[str]] = []
+        search_text = filters.get('search', '')
+
+        type_ids = self._type_candidates(filters.get('type', 'Все'))
+        if type_ids is not None:
+            candidates.append(type_ids)
+
+        deps_ids = self._deps_candidates(filters.get('dependencies', 'Все'))
+        if deps_ids is not None:
+            candidates.append(deps_ids)
+
+        if filters.get('date_enabled', False):
+            date_ids = self._date_candidates(filters.get('start_date'),
+                                             filters.get('end_date'))
+            if date_ids is not None:
+                candidates.append(date_ids)
+
+        if search_text:
+            candidates.extend(self._ngram_candidates(search_text))
+
+        if not candidates:
+            if not search_text:
+                return None
+            result = set(self._keys)
+        else:
+            candidates.sort(key=len)
+            result = set(candidates[0])
+            for ids in candidates[1:]:
+                if not result:
+                    break
+                result &= ids
+
+        # n-граммы дают только кандидатов: проверяем подстроку
+        if search_text:
+            keys = self._keys
+            result = {task_id for task_id in result if search_text in keys[task_id].text}
+        return result
+
+    def _type_candidates(self, dep_type: str) -> Optional[Set[str]]:
+        """Кандидаты по типу зависимости"""
+        if dep_type == 'Все':
+            return None
+        if dep_type == 'Без типа':
+            ids = set()
+            for key in _UNTYPED:
+                ids |= self._by_type.get(key, set())
+            return ids
+        return self._by_type.get(dep_type, set())
+
+    def _deps_candidates(self, deps_filter: str) -> Optional[Set[str]]:
+        """Кандидаты по количеству зависимостей"""
+        if deps_filter == 'Без зависимостей':
+            return self._by_deps[0]
+        if deps_filter == 'С зависимостями':
+            return self._by_deps[1] | self._by_deps[2]
+        if deps_filter == '1 зависимость':
+            return self._by_deps[1]
+        if deps_filter == '2+ зависимости':
+            return self._by_deps[2]
+        return None
+
+    def _date_candidates(self, start_date: Optional[str],
+                         end_date: Optional[str]) -> Optional[Set[str]]:
+        """Задачи, пересекающиеся с диапазоном дат"""
+        if not start_date or not end_date:
+            return None
+        filter_start = parse_date_ordinal(start_date)
+        filter_end = parse_date_ordinal(end_date)
+        if filter_start is None or filter_end is None:
+            return None
+
+        # Начало не позже конца диапазона и окончание не раньше его начала;
+        # перебираем меньший из двух срезов и проверяем второе условие
+        started = bisect_right(self._starts, (filter_end, "\U0010ffff"))
+        not_ended = len(self._ends) - bisect_left(self._ends, (filter_start, ""))
+        keys = self._keys
+        if started <= not_ended:
+            return {task_id for _, task_id in self._starts[:started]
+                    if keys[task_id].end >= filter_start}
+        return {task_id for _, task_id in self._ends[len(self._ends) - not_ended:]
+                if keys[task_id].start <= filter_end}
+
+    def _ngram_candidates(self, search_text: str) -> List[Set[str]]:
+        """Множества кандидатов по n-граммам строки поиска"""
+        if "\x00" in search_text:
+            return [set()]
+        grams = _ngrams(search_text)
+        return [self._ngrams.get(gram, set()) for gram in grams]
+
+    def filter_tasks(self, filters: dict) -> Optional[List[Task]]:
+        """
+        Отфильтровать задачи TaskManager с сохранением исходного порядка
+
+        Returns:
+            list: задачи или None, если фильтры ничего не ограничивают
+        """
+        ids = self.query(filters)
+        if ids is None:
+            return None
+        index_of = self.task_manager.index_of
+        positions = sorted(pos for pos in map(index_of, ids) if pos is not None)
+        get_task = self.task_manager.get_task_by_index
+        return [get_task(pos) for pos in positions]
+
+
+class FilterQueryScheduler:
+    """
+    Выполнение запросов фильтрации в фоновом потоке
+
+    Каждый запрос получает номер поколения, версию данных TaskManager и
+    кортеж задач на момент запроса (порядок строк результата). ID
+    подходящих задач рабочий поток ищет по текущим индексам
+    TaskFilterIndex, поэтому при правках во время запроса результат может
+    не совпадать со снимком - такой результат отбрасывается в потоке Tk
+    по версии, и запрос выполняется заново. Рабочий поток берет только
+    последний запрос из очереди и бросает работу, если за это время
+    пришел более новый.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, filter_index: TaskFilterIndex, widget,
+                 on_result: Callable[[dict, List[Task], int], None]):
+        self.filter_index = filter_index
+        self.task_manager = filter_index.task_manager
+        self.widget = widget
+        self.on_result = on_result
+        self._generation = 0
+        self._requests: "queue.Queue[tuple]" = queue.Queue()
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._poll_job = None
+        self._pending_filters: Optional[dict] = None
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def is_pending(self) -> bool:
+        """Есть ли запрос, результат которого еще не получен"""
+        return self._pending_filters is not None
+
+    def submit(self, filters: dict):
+        """Запустить запрос; предыдущие незавершенные запросы отменяются"""
+        self._generation += 1
+        self._pending_filters = filters
+        snapshot = tuple(self.task_manager.iter_tasks())
+        self._requests.put((self._generation, filters, self.task_manager.version, snapshot))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        if self._poll_job is None:
+            self._poll_job = self.widget.after(self.POLL_MS, self._poll)
+
+    def _run(self):
+        """Рабочий поток: выполнять последний запрос из очереди"""
+        while True:
+            request = self._requests.get()
+            # Из накопившихся запросов нужен только последний
+            while True:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+            generation, filters, version, snapshot = request
+            try:
+                tasks = self._execute(generation, filters, snapshot)
+            except Exception as e:
+                print(f"Ошибка фильтрации: {e}")
+                # Без результата запрос остался бы ожидающим навсегда:
+                # показываем список без фильтров
+                tasks = list(snapshot)
+            if tasks is not None:
+                self._results.put((generation, filters, version, tasks))
+
+    def _execute(self, generation: int, filters: dict,
+                 snapshot: tuple) -> Optional[List[Task]]:
+        """Оставить задачи кортежа, найденные по индексам; None, если запрос устарел"""
+        if generation != self._generation:
+            return None
+        ids = self.filter_index.query(filters)
+        if generation != self._generation:
+            return None
+        if ids is None:
+            return list(snapshot)
+        return [task for task in snapshot if task.id in ids]
+
+    def _poll(self):
+        """Забрать результаты рабочего потока (поток Tk)"""
+        self._poll_job = None
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest is not None and latest[0] == self._generation:
+            generation, filters, version, tasks = latest
+            if version == self.task_manager.version:
+                self._pending_filters = None
+                self.on_result(filters, tasks, version)
+                return
+            # Данные изменились, пока выполнялся запрос - повторяем его
+            self.submit(filters)
+            return
+
+        if self._pending_filters is not None:
+            self._poll_job = self.widget.after(self.POLL_MS, self._poll)
@@ -0,0 +1,131 @@
+"""
+Граф зависимостей между задачами
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class DependencyGraph:
+    """
+    Граф зависимостей с прямой и обратной смежностью по ID задач
+
+    Ребро predecessor -> successor означает, что successor зависит от
+    predecessor. Ребра на несуществующие задачи допускаются: они
+    повторяют содержимое Task.dependencies как есть.
+    """
+
+    def __init__(self):
+        self._predecessors: Dict[str, Set[str]] = {}
+        self._successors: Dict[str, Set[str]] = {}
+
+    def set_dependencies(self, task_id: str, dependency_ids: Iterable[str]):
+        """Заменить набор зависимостей задачи"""
+        new_preds = {dep_id for dep_id in dependency_ids if dep_id}
+        old_preds = self._predecessors.get(task_id, set())
+
+        for dep_id in old_preds - new_preds:
+            successors = self._successors.get(dep_id)
+            if successors is not None:
+                successors.discard(task_id)
+                if not successors:
+                    del self._successors[dep_id]
+
+        for dep_id in new_preds - old_preds:
+            self._successors.setdefault(dep_id, set()).add(task_id)
+
+        if new_preds:
+            self._predecessors[task_id] = new_preds
+        else:
+            self._predecessors.pop(task_id, None)
+
+    def remove_task(self, task_id: str):
+        """Удалить исходящие зависимости задачи"""
+        self.set_dependencies(task_id, ())
+
+    def clear(self):
+        """Очистить граф"""
+        self._predecessors.clear()
+        self._successors.clear()
+
+    def predecessors(self, task_id: str) -> Set[str]:
+        """Задачи, от которых зависит task_id"""
+        return self._predecessors.get(task_id, set())
+
+    def successors(self, task_id: str) -> Set[str]:
+        """Задачи, которые зависят от task_id"""
+        return self._successors.get(task_id, set())
+
+    def edge_count(self) -> int:
+        """Количество ребер"""
+        return sum(len(preds) for preds in self._predecessors.values())
+
+    def find_path(self, source: str, targets: Set[str]) -> Optional[List[str]]:
+        """Найти путь source -> ... -> одна из targets по ребрам (BFS)"""
+        if source in targets:
+            return [source]
+
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for succ in self._successors.get(node, ()):
+                if succ in parents:
+                    continue
+                parents[succ] = node
+                if succ in targets:
+                    path = [succ]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    path.reverse()
+                    return path
+                queue.append(succ)
+        return None
+
+    def find_cycle_with(self, task_id: str,
+                        dependency_ids: Iterable[str]) -> Optional[List[str]]:
+        """
+        Проверить за O(V+E), появится ли цикл при новых зависимостях задачи
+
+        Returns:
+            list: цикл в виде списка ID (первый == последний) или None
+        """
+        targets = {dep_id for dep_id in dependency_ids if dep_id}
+        if not targets:
+            return None
+        path = self.find_path(task_id, targets)
+        if path is None:
+            return None
+        return path + [task_id]
+
+    def topological_order(self, task_ids: Iterable[str]) -> Optional[List[str]]:
+        """
+        Топологическая сортировка (алгоритм Кана) за O(V+E)
+
+        Учитываются только ребра между переданными задачами; порядок
+        независимых задач сохраняет исходный порядок task_ids.
+
+        Returns:
+            list: ID в порядке зависимостей или None, если есть цикл
+        """
+        nodes = list(task_ids)
+        node_set = set(nodes)
+        in_degree = {}
+        for node in nodes:
+            in_degree[node] = sum(
+                1 for pred in self._predecessors.get(node, ()) if pred in node_set
+            )
+
+        queue = deque(node for node in nodes if in_degree[node] == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for succ in self._successors.get(node, ()):
+                if succ in node_set:
+                    in_degree[succ] -= 1
+                    if in_degree[succ] == 0:
+                        queue.append(succ)
+
+        if len(order) != len(nodes):
+            return None
+        return order
@@ -0,0 +1,274 @@
+"""
+Импорт задач из Excel (.xlsx) и CSV
+
+Читается раскладка колонок, которую пишут ExcelExporter (в том числе
+экспорт по разделам: все листы с таблицей задач) и CsvExporter. Книги
+Excel читаются потоково (read-only режим openpyxl). Все строки проверяются
+за один проход, ошибки собираются вместе; задачи загружаются только если
+ошибок нет. Длительность пересчитывается по датам.
+"""
+import csv
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from graph import DependencyGraph
+from models import Task, format_date_ordinal, parse_date_ordinal
+
+# Заголовки колонок (без учета регистра) -> поле Task.to_dict
+HEADER_FIELDS = {
+    "id": "id",
+    "объект": "object",
+    "object": "object",
+    "дата начала": "start_date",
+    "start_date": "start_date",
+    "дата окончания": "end_date",
+    "end_date": "end_date",
+    "длительность": "duration",
+    "duration": "duration",
+    "зависимости": "dependencies",
+    "dependencies": "dependencies",
+    "тип зависимости": "type",
+    "type": "type",
+}
+REQUIRED_FIELDS = ("id", "start_date", "end_date")
+
+# Значение колонки зависимостей, которым ExcelExporter обозначает их отсутствие
+NO_DEPENDENCIES = "Нет"
+
+# Через сколько строк сообщать о прогрессе и проверять отмену
+PROGRESS_STEP = 2000
+
+
+class ImportCancelled(Exception):
+    """Импорт отменен пользователем"""
+
+
+class ImportResult(NamedTuple):
+    """Результат чтения файла: задачи и ошибки по строкам"""
+    tasks: List[Task]
+    errors: List[str]
+
+
+def _text(value) -> str:
+    """Значение ячейки как строка (целые числа из Excel - без '.0')"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+class TaskImporter:
+    """Чтение задач из .xlsx и .csv с проверкой всех строк"""
+
+    EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+
+    @staticmethod
+    def read(filename: str,
+             progress: Optional[Callable[[int, int], None]] = None,
+             cancel_event: Optional[threading.Event] = None) -> ImportResult:
+        """
+        Прочитать и проверить задачи файла
+
+        Тип файла определяется по расширению. Ошибка чтения самого
+        файла возвращается как единственная ошибка результата;
+        отмена через cancel_event - исключение ImportCancelled.
+        """
+        try:
+            if Path(filename).suffix.lower() in TaskImporter.EXCEL_SUFFIXES:
+                records, total = TaskImporter._read_xlsx(filename)
+            else:
+                records, total = TaskImporter._read_csv(filename)
+            return TaskImporter.parse_records(records, total, progress, cancel_event)
+        except ImportCancelled:
+            raise
+        except ImportError:
+            return ImportResult([], ["Библиотека openpyxl не установлена. "
+                                     "Выполните: pip install openpyxl"])
+        except Exception as e:
+            return ImportResult([], [f"Ошибка чтения файла: {str(e)}"])
+
+    @staticmethod
+    def _header_map(row: Iterable) -> Dict[int, str]:
+        """Номер колонки -> поле задачи по строке заголовков"""
+        mapping = {}
+        for col, header in enumerate(row):
+            name = HEADER_FIELDS.get(_text(header).lower())
+            if name is not None and name not in mapping.values():
+                mapping[col] = name
+        return mapping
+
+    @staticmethod
+    def _read_xlsx(filename: str) -> Tuple[Iterator[tuple], int]:
+        """
+        Строки всех листов с таблицей задач (read-only книга)
+
+        Returns:
+            tuple: (итератор (место, {поле: значение}), примерное число строк)
+        """
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(filename, read_only=True, data_only=True)
+        sheets = []
+        for ws in workbook.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            mapping = TaskImporter._header_map(next(rows, ()))
+            if all(name in mapping.values() for name in REQUIRED_FIELDS):
+                sheets.append((ws.title, rows, mapping))
+        if not sheets:
+            workbook.close()
+            raise ValueError("В книге нет листа с колонками ID, "
+                             "'Дата начала' и 'Дата окончания'")
+        total = sum(max((ws.max_row or 1) - 1, 0) for ws in workbook.worksheets
+                    if ws.title in {title for title, _, _ in sheets})
+
+        def records():
+            try:
+                for title, rows, mapping in sheets:
+                    for row_number, row in enumerate(rows, start=2):
+                        if not any(value is not None and value != "" for value in row):
+                            # После пустой строки ExcelExporter пишет итоги
+                            break
+                        values = {name: row[col] if col < len(row) else None
+                                  for col, name in mapping.items()}
+                        yield f"Лист '{title}', строка {row_number}", values
+            finally:
+                workbook.close()
+
+        return records(), total
+
+    @staticmethod
+    def _read_csv(filename: str) -> Tuple[Iterator[tuple], int]:
+        """
+        Строки CSV (UTF-8, с BOM или без)
+
+        Returns:
+            tuple: (итератор (место, {поле: значение}), 0 - число строк неизвестно)
+        """
+        f = open(filename, newline="", encoding="utf-8-sig")
+        reader = csv.reader(f)
+        mapping = TaskImporter._header_map(next(reader, ()))
+        missing = [name for name in REQUIRED_FIELDS if name not in mapping.values()]
+        if missing:
+            f.close()
+            raise ValueError(f"Нет колонок: {', '.join(missing)}")
+
+        def records():
+            with f:
+                # Ячейка с несколькими зависимостями занимает несколько строк файла
+                line = reader.line_num + 1
+                for row in reader:
+                    row_line, line = line, reader.line_num + 1
+                    if not any(row):
+                        continue
+                    values = {name: row[col] if col < len(row) else None
+                              for col, name in mapping.items()}
+                    yield f"Строка {row_line}", values
+
+        return records(), 0
+
+    @staticmethod
+    def parse_records(records: Iterable[tuple], total: int = 0,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      cancel_event: Optional[threading.Event] = None) -> ImportResult:
+        """
+        Проверить строки и собрать задачи за один проход
+
+        Даты разбираются через общий кэш parse_date_ordinal, зависимости -
+        разбиением по строкам. Ссылки на неизвестные задачи, совпадение
+        даты начала с зависимостью и циклы проверяются после прохода по
+        собранным ID. Ошибки не прерывают проверку остальных строк.
+        """
+        tasks: List[Task] = []
+        errors: List[str] = []
+        places: Dict[str, str] = {}
+
+        for count, (place, values) in enumerate(records):
+            if count % PROGRESS_STEP == 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelled()
+                if progress is not None:
+                    progress(count, total)
+
+            row_errors = []
+            task_id = _text(values.get("id"))
+            if not task_id:
+                row_errors.append("не указан ID")
+            elif task_id in places:
+                row_errors.append(f"ID {task_id} уже встречался ({places[task_id]})")
+
+            start_date, start = TaskImporter._parse_date(values.get("start_date"))
+            end_date, end = TaskImporter._parse_date(values.get("end_date"))
+            if start is None:
+                row_errors.append(f"некорректная дата начала '{_text(values.get('start_date'))}'")
+            if end is None:
+                row_errors.append(f"некорректная дата окончания '{_text(values.get('end_date'))}'")
+            if start is not None and end is not None and end < start:
+                row_errors.append("дата окончания раньше даты начала")
+
+            if row_errors:
+                errors.append(f"{place}: {'; '.join(row_errors)}")
+                continue
+
+            places[task_id] = place
+            tasks.append(Task.from_ordinals(
+                task_id,
+                _text(values.get("object")),
+                start_date,
+                end_date,
+                start,
+                end,
+                end - start + 1,
+                TaskImporter._parse_dependencies(values.get("dependencies")),
+                _text(values.get("type"))
+            ))
+
+        errors += TaskImporter._check_links(tasks, places)
+        return ImportResult(tasks, errors)
+
+    @staticmethod
+    def _parse_date(value) -> Tuple[str, Optional[int]]:
+        """Дата ячейки: строка 'дд.мм.гггг' или дата Excel"""
+        if isinstance(value, (datetime, date)):
+            ordinal = value.toordinal()
+            return format_date_ordinal(ordinal), ordinal
+        text = _text(value)
+        return text, parse_date_ordinal(text)
+
+    @staticmethod
+    def _parse_dependencies(value) -> List[str]:
+        """Метки зависимостей из ячейки (по одной в строке)"""
+        text = _text(value)
+        if not text or text == NO_DEPENDENCIES:
+            return []
+        return [label.strip() for label in text.splitlines() if label.strip()]
+
+    @staticmethod
+    def _check_links(tasks: List[Task], places: Dict[str, str]) -> List[str]:
+        """
+        Проверить ссылки зависимостей и отсутствие циклов
+
+        Как и при редактировании, дата начала задачи не может совпадать
+        с датой начала ее зависимости.
+        """
+        errors = []
+        starts = {task.id: task.start_ordinal for task in tasks}
+        graph = DependencyGraph()
+        for task in tasks:
+            dependency_ids = task.dependency_ids()
+            problems = []
+            for dep_id in dependency_ids:
+                if dep_id not in starts:
+                    problems.append(f"зависимость {dep_id} не найдена")
+                elif dep_id == task.id:
+                    problems.append("задача зависит от самой себя")
+                elif starts[dep_id] == task.start_ordinal:
+                    problems.append(f"дата начала совпадает с зависимостью {dep_id}")
+            if problems:
+                errors.append(f"{places[task.id]}: {'; '.join(problems)}")
+            graph.set_dependencies(task.id, dependency_ids)
+
+        if not errors and graph.topological_order(starts) is None:
+            errors.append("Зависимости образуют цикл")
+        return errors
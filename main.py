@@ -6,6 +6,7 @@
 - Factory (DialogFactory)
 - Observer (для обновления представлений)
 """
+import multiprocessing
 import customtkinter as ctk
 from controller import ApplicationController
 
@@ -49,4 +50,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # В собранном .exe рабочие процессы экспорта запускаются через этот
+    # же файл: freeze_support() выполняет их задание вместо приложения
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,14 +1,52 @@
 """
 Модели данных для приложения управления проектами
 """
+import sys
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Optional
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+from graph import DependencyGraph
 
 
-@dataclass
+_object_setattr = object.__setattr__
+_intern = sys.intern
+
+
+def _intern_list(values: List[str]) -> List[str]:
+    """Копия списка строк с интернированными значениями"""
+    return [_intern(value) if value.__class__ is str else value for value in values]
+
+
+@lru_cache(maxsize=8192)
+def parse_date_ordinal(text: str) -> Optional[int]:
+    """Разобрать дату 'дд.мм.гггг' в порядковый номер дня (быстрее strptime)"""
+    try:
+        day, month, year = text.split(".")
+        return date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_date_ordinal(ordinal: int) -> str:
+    """Преобразовать порядковый номер дня в строку 'дд.мм.гггг'"""
+    return date.fromordinal(ordinal).strftime("%d.%m.%Y")
+
+
+def parse_dependency_id(label: str) -> str:
+    """Извлечь ID задачи из метки зависимости вида 'WBS-01 - Объект'"""
+    return label.split(" - ")[0].strip() if label else ""
+
+
+@dataclass(slots=True, init=False)
 class Task:
-    """Модель задачи проекта"""
+    """
+    Модель задачи проекта
+
+    Хранится компактно: __slots__ вместо __dict__, повторяющиеся строки
+    (даты, тип, метки зависимостей) интернируются, разобранные даты
+    кэшируются как порядковые номера дней.
+    """
     id: str
     object: str
     start_date: str
@@ -16,21 +54,91 @@ class Task:
     duration: int = 0
     dependencies: List[str] = field(default_factory=list)
     type: str = ""
+    _start_ordinal: Optional[int] = field(default=None, repr=False, compare=False)
+    _end_ordinal: Optional[int] = field(default=None, repr=False, compare=False)
 
-    def __post_init__(self):
-        """Вычисление длительности после инициализации"""
-        if self.duration == 0:
-            self.duration = self.calculate_duration()
+    def __init__(self, id: str, object: str, start_date: str, end_date: str,
+                 duration: int = 0, dependencies: Optional[List[str]] = None,
+                 type: str = ""):
+        # Прямая запись в слоты: __setattr__ нужен только для последующих правок
+        _set = _object_setattr
+        if start_date.__class__ is str:
+            start_date = _intern(start_date)
+        if end_date.__class__ is str:
+            end_date = _intern(end_date)
+        _set(self, "id", id)
+        _set(self, "object", object)
+        _set(self, "start_date", start_date)
+        _set(self, "end_date", end_date)
+        _set(self, "_start_ordinal", parse_date_ordinal(start_date))
+        _set(self, "_end_ordinal", parse_date_ordinal(end_date))
+        _set(self, "dependencies", _intern_list(dependencies) if dependencies else [])
+        _set(self, "type", _intern(type) if type.__class__ is str else type)
+        _set(self, "duration", duration)
+        # Вычисление длительности после инициализации
+        if duration == 0:
+            _set(self, "duration", self.calculate_duration())
+
+    @classmethod
+    def from_ordinals(cls, id: str, object: str, start_date: str, end_date: str,
+                      start_ordinal: Optional[int], end_ordinal: Optional[int],
+                      duration: int, dependencies: List[str], type: str) -> 'Task':
+        """Создать задачу из уже разобранных полей (без разбора дат)"""
+        task = cls.__new__(cls)
+        _set = _object_setattr
+        _set(task, "id", id)
+        _set(task, "object", object)
+        _set(task, "start_date", _intern(start_date))
+        _set(task, "end_date", _intern(end_date))
+        _set(task, "_start_ordinal", start_ordinal)
+        _set(task, "_end_ordinal", end_ordinal)
+        _set(task, "dependencies", dependencies)
+        _set(task, "type", _intern(type))
+        _set(task, "duration", duration)
+        return task
+
+    def __setattr__(self, name, value):
+        """Интернировать повторяющиеся строки и пересчитать кэш дат"""
+        if name == "start_date":
+            self._set_start_date(value)
+        elif name == "end_date":
+            self._set_end_date(value)
+        elif name == "dependencies":
+            _object_setattr(self, name, _intern_list(value))
+        elif name == "type" and value.__class__ is str:
+            _object_setattr(self, name, _intern(value))
+        else:
+            _object_setattr(self, name, value)
+
+    def _set_start_date(self, value: str):
+        """Записать дату начала и ее порядковый номер"""
+        if value.__class__ is str:
+            value = _intern(value)
+        _object_setattr(self, "start_date", value)
+        _object_setattr(self, "_start_ordinal", parse_date_ordinal(value))
+
+    def _set_end_date(self, value: str):
+        """Записать дату окончания и ее порядковый номер"""
+        if value.__class__ is str:
+            value = _intern(value)
+        _object_setattr(self, "end_date", value)
+        _object_setattr(self, "_end_ordinal", parse_date_ordinal(value))
+
+    @property
+    def start_ordinal(self) -> Optional[int]:
+        """Дата начала как порядковый номер дня (None, если дата некорректна)"""
+        return self._start_ordinal
+
+    @property
+    def end_ordinal(self) -> Optional[int]:
+        """Дата окончания как порядковый номер дня (None, если дата некорректна)"""
+        return self._end_ordinal
 
     def calculate_duration(self) -> int:
         """Вычисление длительности между двумя датами"""
-        try:
-            start = datetime.strptime(self.start_date, "%d.%m.%Y")
-            end = datetime.strptime(self.end_date, "%d.%m.%Y")
-            duration = (end - start).days + 1
-            return max(0, duration)
-        except Exception:
+        if self._start_ordinal is None or self._end_ordinal is None:
             return 0
+        return max(0, self._end_ordinal - self._start_ordinal + 1)
 
     def to_dict(self) -> dict:
         """Конвертация в словарь"""
@@ -40,7 +148,7 @@ class Task:
             "start_date": self.start_date,
             "end_date": self.end_date,
             "duration": self.duration,
-            "dependencies": self.dependencies,
+            "dependencies": list(self.dependencies),
             "type": self.type
         }
 
@@ -59,6 +167,10 @@ class Task:
         if dependency in self.dependencies:
             self.dependencies.remove(dependency)
 
+    def dependency_ids(self) -> List[str]:
+        """Получить ID задач, от которых зависит задача"""
+        return [parse_dependency_id(dep) for dep in self.dependencies]
+
     def get_dependency_text(self) -> str:
         """Получить текст зависимостей для отображения"""
         if not self.dependencies:
@@ -74,35 +186,127 @@ class TaskManager:
 
     def __init__(self):
         self._tasks: List[Task] = []
+        # Индекс ID -> позиция в списке для поиска за O(1)
+        self._index: Dict[str, int] = {}
+        # Граф зависимостей, синхронизируется при каждом изменении
+        self.graph = DependencyGraph()
+        # Наблюдатели за изменениями (индексы, журнал и т.п.)
+        self._observers: List[object] = []
+        # Версия данных: увеличивается при каждом изменении
+        self.version = 0
+        # Версия, записанная на диск последней
+        self.saved_version = 0
+
+    def add_observer(self, observer):
+        """
+        Подписать наблюдателя на изменения задач
+
+        Наблюдатель реализует методы on_task_added(task),
+        on_task_removed(task), on_task_updated(old_id, task)
+        и on_tasks_reset(tasks).
+        """
+        self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        """Отписать наблюдателя"""
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def _notify(self, event: str, *args):
+        """Зафиксировать изменение и уведомить наблюдателей"""
+        self.version += 1
+        for observer in self._observers:
+            getattr(observer, event)(*args)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Есть ли изменения, не записанные на диск"""
+        return self.version != self.saved_version
+
+    def mark_saved(self, version: Optional[int] = None):
+        """Отметить версию данных как сохраненную (по умолчанию текущую)"""
+        self.saved_version = self.version if version is None else version
+
+    def _reindex_from(self, start: int):
+        """Пересчитать позиции в индексе начиная с заданной"""
+        for pos in range(start, len(self._tasks)):
+            self._index[self._tasks[pos].id] = pos
 
     def add_task(self, task: Task) -> bool:
         """Добавить задачу"""
-        if self.get_task_by_id(task.id):
+        if task.id in self._index:
             return False
+        self._index[task.id] = len(self._tasks)
         self._tasks.append(task)
+        self.graph.set_dependencies(task.id, task.dependency_ids())
+        self._notify("on_task_added", task)
         return True
 
+    def bulk_load(self, tasks: List[Task]) -> List[str]:
+        """
+        Добавить много задач за один проход
+
+        Задачи с повторяющимися ID (внутри списка или уже существующими)
+        пропускаются, остальные устанавливаются одной операцией.
+
+        Returns:
+            list: ID всех пропущенных дубликатов
+        """
+        return self._install(self._tasks.copy(), self._index.copy(), tasks)
+
+    def replace_all(self, tasks: List[Task]) -> List[str]:
+        """Заменить все задачи новым списком (см. bulk_load)"""
+        return self._install([], {}, tasks)
+
+    def _install(self, new_tasks: List[Task], new_index: Dict[str, int],
+                 tasks: List[Task]) -> List[str]:
+        """Собрать новый список и индекс, затем подменить их целиком"""
+        duplicates = []
+        for task in tasks:
+            if task.id in new_index:
+                duplicates.append(task.id)
+                continue
+            new_index[task.id] = len(new_tasks)
+            new_tasks.append(task)
+
+        new_graph = DependencyGraph()
+        for task in new_tasks:
+            new_graph.set_dependencies(task.id, task.dependency_ids())
+
+        self._tasks = new_tasks
+        self._index = new_index
+        self.graph = new_graph
+        self._notify("on_tasks_reset", new_tasks)
+        return duplicates
+
     def remove_task(self, task_id: str) -> bool:
         """Удалить задачу по ID"""
-        task = self.get_task_by_id(task_id)
-        if task:
-            self._tasks.remove(task)
-            return True
-        return False
+        index = self._index.get(task_id)
+        if index is None:
+            return False
+        return self.remove_task_by_index(index)
 
     def remove_task_by_index(self, index: int) -> bool:
         """Удалить задачу по индексу"""
         if 0 <= index < len(self._tasks):
-            self._tasks.pop(index)
+            task = self._tasks.pop(index)
+            del self._index[task.id]
+            self.graph.remove_task(task.id)
+            self._reindex_from(index)
+            self._notify("on_task_removed", task)
             return True
         return False
 
     def get_task_by_id(self, task_id: str) -> Optional[Task]:
         """Получить задачу по ID"""
-        for task in self._tasks:
-            if task.id == task_id:
-                return task
-        return None
+        index = self._index.get(task_id)
+        if index is None:
+            return None
+        return self._tasks[index]
+
+    def index_of(self, task_id: str) -> Optional[int]:
+        """Получить позицию задачи в списке по ID"""
+        return self._index.get(task_id)
 
     def get_task_by_index(self, index: int) -> Optional[Task]:
         """Получить задачу по индексу"""
@@ -113,14 +317,64 @@ class TaskManager:
     def update_task(self, index: int, updated_task: Task) -> bool:
         """Обновить задачу по индексу"""
         if 0 <= index < len(self._tasks):
+            old_task = self._tasks[index]
+            if updated_task.id != old_task.id:
+                if updated_task.id in self._index:
+                    return False
+                del self._index[old_task.id]
+                self._index[updated_task.id] = index
+                self.graph.remove_task(old_task.id)
             self._tasks[index] = updated_task
+            self.graph.set_dependencies(updated_task.id, updated_task.dependency_ids())
+            self._notify("on_task_updated", old_task.id, updated_task)
             return True
         return False
 
+    def set_dependencies(self, task_id: str, dependencies: List[str]) -> bool:
+        """Заменить зависимости задачи"""
+        index = self._index.get(task_id)
+        if index is None:
+            return False
+        old_task = self._tasks[index]
+        # Новый объект вместо правки на месте: снимки списка задач
+        # (фоновый экспорт) продолжают видеть прежние зависимости
+        task = Task.from_ordinals(
+            old_task.id, old_task.object, old_task.start_date, old_task.end_date,
+            old_task.start_ordinal, old_task.end_ordinal, old_task.duration,
+            _intern_list(dependencies), old_task.type
+        )
+        self._tasks[index] = task
+        self.graph.set_dependencies(task_id, task.dependency_ids())
+        self._notify("on_task_updated", task_id, task)
+        return True
+
+    def find_dependency_cycle(self, task_id: str,
+                              dependencies: List[str]) -> Optional[List[str]]:
+        """Найти цикл, который образуется при новых зависимостях задачи"""
+        dep_ids = [parse_dependency_id(dep) for dep in dependencies]
+        return self.graph.find_cycle_with(task_id, dep_ids)
+
+    def get_dependents(self, task_id: str) -> List[Task]:
+        """Получить задачи, которые зависят от указанной"""
+        return [self._tasks[self._index[succ_id]]
+                for succ_id in self.graph.successors(task_id)
+                if succ_id in self._index]
+
+    def get_tasks_in_dependency_order(self) -> Optional[List[Task]]:
+        """Получить задачи в топологическом порядке (None при цикле)"""
+        order = self.graph.topological_order(task.id for task in self._tasks)
+        if order is None:
+            return None
+        return [self._tasks[self._index[task_id]] for task_id in order]
+
     def get_all_tasks(self) -> List[Task]:
         """Получить все задачи"""
         return self._tasks.copy()
 
+    def iter_tasks(self) -> Iterator[Task]:
+        """Перебрать задачи без копирования списка (только для чтения)"""
+        return iter(self._tasks)
+
     def get_available_dependencies(self, task_id: str) -> List[Task]:
         """Получить доступные задачи для зависимостей"""
         return [task for task in self._tasks if task.id != task_id]
@@ -128,6 +382,9 @@ class TaskManager:
     def clear_all(self):
         """Очистить все задачи"""
         self._tasks.clear()
+        self._index.clear()
+        self.graph.clear()
+        self._notify("on_tasks_reset", [])
 
     def __len__(self):
-        return len(self._tasks)
\ No newline at end of file
+        return len(self._tasks)
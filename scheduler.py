@@ -0,0 +1,346 @@
+"""
+Расчет расписания методом критического пути (CPM)
+"""
+from array import array
+import heapq
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Set
+from models import TaskManager, format_date_ordinal
+
+
+# Коды типов связи (по первым двум буквам Task.type)
+LINK_FS, LINK_SS, LINK_FF, LINK_SF = 0, 1, 2, 3
+_LINK_CODES = {"FS": LINK_FS, "SS": LINK_SS, "FF": LINK_FF, "SF": LINK_SF}
+
+
+def link_code(task_type: str) -> int:
+    """Код типа связи задачи; пустой тип и '--' трактуются как FS"""
+    return _LINK_CODES.get((task_type or "")[:2].upper(), LINK_FS)
+
+
+class TaskSchedule(NamedTuple):
+    """Результат расчета для одной задачи"""
+    early_start: str
+    early_finish: str
+    late_start: str
+    late_finish: str
+    total_float: int
+    is_critical: bool
+
+
+class CriticalPathScheduler:
+    """
+    Планировщик CPM: прямой и обратный проход по графу зависимостей
+
+    Тип связи задачи (Task.type) применяется ко всем ее входящим связям.
+    Задача не может начаться раньше собственной даты начала, а связи
+    с предшественниками могут только сдвигать ее позже. Финиш хранится
+    исключающим (finish = start + duration), в строках - включительно.
+    Результаты лежат в компактных массивах по позиции задачи.
+    """
+
+    def __init__(self, task_manager: TaskManager):
+        self.task_manager = task_manager
+        self.has_cycle = False
+        self._clear()
+
+    def _clear(self):
+        """Сбросить результаты"""
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._preds: List[List[int]] = []
+        self._succs: List[List[int]] = []
+        self._order: List[int] = []
+        self._rank = array('l')
+        self._links = bytearray()
+        self._planned = array('l')
+        self._duration = array('l')
+        self._es = array('l')
+        self._ef = array('l')
+        self._ls = array('l')
+        self._lf = array('l')
+        self.project_finish: Optional[int] = None
+
+    def recompute(self) -> bool:
+        """
+        Пересчитать расписание всего проекта за O(V+E)
+
+        Returns:
+            bool: False, если в зависимостях есть цикл
+        """
+        tasks = self.task_manager.get_all_tasks()
+        graph = self.task_manager.graph
+        n = len(tasks)
+
+        ids = [task.id for task in tasks]
+        pos = {task_id: i for i, task_id in enumerate(ids)}
+        starts = [task.start_ordinal for task in tasks]
+        known_starts = [start for start in starts if start is not None]
+        project_start = min(known_starts) if known_starts else 0
+
+        planned = [start if start is not None else project_start
+                   for start in starts]
+        duration = [max(0, task.duration) for task in tasks]
+        links = bytes(link_code(task.type) for task in tasks)
+
+        # Списки смежности по позициям (только существующие задачи)
+        predecessors = graph.predecessors
+        preds = [[pos[pred_id] for pred_id in predecessors(task_id) if pred_id in pos]
+                 for task_id in ids]
+        succs: List[List[int]] = [[] for _ in range(n)]
+        for i, task_preds in enumerate(preds):
+            for p in task_preds:
+                succs[p].append(i)
+
+        order = self._topological_order(preds, succs)
+        if order is None:
+            self._clear()
+            self.has_cycle = True
+            return False
+
+        es, ef = self._forward_pass(order, preds, links, duration, planned)
+        project_finish = max(ef) if n else 0
+        ls, lf = self._backward_pass(order, preds, links, duration, project_finish)
+
+        rank = array('l', [0]) * n
+        for r, i in enumerate(order):
+            rank[i] = r
+
+        self._ids, self._pos = ids, pos
+        self._preds, self._succs = preds, succs
+        self._order, self._rank = order, rank
+        self._links = bytearray(links)
+        self._planned = array('l', planned)
+        self._duration = array('l', duration)
+        self._es, self._ef, self._ls, self._lf = es, ef, ls, lf
+        self.project_finish = project_finish if n else None
+        self.has_cycle = False
+        return True
+
+    @staticmethod
+    def _topological_order(preds: List[List[int]],
+                           succs: List[List[int]]) -> Optional[List[int]]:
+        """Порядок Кана по позициям; None при цикле"""
+        in_degree = [len(p) for p in preds]
+        queue = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for s in succs[i]:
+                in_degree[s] -= 1
+                if in_degree[s] == 0:
+                    queue.append(s)
+        if len(order) != len(preds):
+            return None
+        return order
+
+    @staticmethod
+    def _early_start(link: int, dur: int, start: int, task_preds: List[int],
+                     es: List[int], ef: List[int]) -> int:
+        """Ранний старт задачи по ее собственной дате и предшественникам"""
+        if not task_preds:
+            return start
+        if link == LINK_FS:
+            bound = max([ef[p] for p in task_preds])
+        elif link == LINK_SS:
+            bound = max([es[p] for p in task_preds])
+        elif link == LINK_FF:
+            bound = max([ef[p] for p in task_preds]) - dur
+        else:
+            bound = max([es[p] for p in task_preds]) - dur
+        return bound if bound > start else start
+
+    def _forward_pass(self, order, preds, links, duration, planned):
+        """Прямой проход: ранние старт и финиш"""
+        es = list(planned)
+        ef = [0] * len(planned)
+        early_start = self._early_start
+        for i in order:
+            start = early_start(links[i], duration[i], es[i], preds[i], es, ef)
+            es[i] = start
+            ef[i] = start + duration[i]
+        return array('l', es), array('l', ef)
+
+    @staticmethod
+    def _backward_pass(order, preds, links, duration, project_finish):
+        """Обратный проход: поздние старт и финиш"""
+        n = len(duration)
+        lf = [project_finish] * n
+        ls = [0] * n
+        for i in reversed(order):
+            finish = lf[i]
+            late_start = finish - duration[i]
+            ls[i] = late_start
+            link = links[i]
+            for p in preds[i]:
+                if link == LINK_FS:
+                    bound = late_start
+                elif link == LINK_SS:
+                    bound = late_start + duration[p]
+                elif link == LINK_FF:
+                    bound = finish
+                else:
+                    bound = finish + duration[p]
+                if bound < lf[p]:
+                    lf[p] = bound
+        return array('l', ls), array('l', lf)
+
+    def reschedule_task(self, task_id: str) -> Set[str]:
+        """
+        Пересчитать расписание после изменения дат или типа одной задачи
+
+        Прямой проход идет только по последователям задачи в
+        топологическом порядке и останавливается там, где ранние даты
+        не сдвинулись; обратный - по предшественникам. Если изменилась
+        структура проекта (ID, состав задач) или общий финиш, выполняется
+        полный пересчет.
+
+        Returns:
+            set: ID задач, у которых изменились рассчитанные даты
+        """
+        task = self.task_manager.get_task_by_id(task_id)
+        i = self._pos.get(task_id)
+        if (task is None or i is None or self.has_cycle
+                or len(self.task_manager) != len(self._ids)
+                or self.task_manager.get_task_by_index(i) is not task):
+            return self._recompute_all()
+
+        start = task.start_ordinal
+        if start is None:
+            return self._recompute_all()
+        self._planned[i] = start
+        self._duration[i] = max(0, task.duration)
+        self._links[i] = link_code(task.type)
+
+        changed = {i}
+        changed |= self._propagate_forward(i)
+        project_finish = max(self._ef)
+        if project_finish != self.project_finish:
+            old_ls, old_lf = self._ls, self._lf
+            self._ls, self._lf = self._backward_pass(
+                self._order, self._preds, self._links, self._duration, project_finish
+            )
+            self.project_finish = project_finish
+            changed.update(j for j in range(len(self._ids))
+                           if old_ls[j] != self._ls[j] or old_lf[j] != self._lf[j])
+        else:
+            changed |= self._propagate_backward(i)
+
+        return {self._ids[j] for j in changed}
+
+    def _recompute_all(self) -> Set[str]:
+        """Полный пересчет; возвращает ID всех задач"""
+        self.recompute()
+        return {task.id for task in self.task_manager.get_all_tasks()}
+
+    def _propagate_forward(self, source: int) -> Set[int]:
+        """Распространить ранние даты от source вниз по последователям"""
+        es, ef, rank = self._es, self._ef, self._rank
+        preds, succs = self._preds, self._succs
+        links, duration, planned = self._links, self._duration, self._planned
+        changed = set()
+
+        heap = [(rank[source], source)]
+        queued = {source}
+        while heap:
+            _, i = heapq.heappop(heap)
+            queued.discard(i)
+            start = self._early_start(links[i], duration[i], planned[i],
+                                      preds[i], es, ef)
+            finish = start + duration[i]
+            if start == es[i] and finish == ef[i]:
+                continue
+            es[i] = start
+            ef[i] = finish
+            changed.add(i)
+            for s in succs[i]:
+                if s not in queued:
+                    queued.add(s)
+                    heapq.heappush(heap, (rank[s], s))
+        return changed
+
+    def _propagate_backward(self, source: int) -> Set[int]:
+        """Распространить поздние даты от source вверх по предшественникам"""
+        ls, lf, rank = self._ls, self._lf, self._rank
+        preds, succs = self._preds, self._succs
+        links, duration = self._links, self._duration
+        project_finish = self.project_finish
+        changed = set()
+
+        heap = [(-rank[source], source)]
+        queued = {source}
+        while heap:
+            _, j = heapq.heappop(heap)
+            queued.discard(j)
+            finish = project_finish
+            for s in succs[j]:
+                link = links[s]
+                if link == LINK_FS:
+                    bound = ls[s]
+                elif link == LINK_SS:
+                    bound = ls[s] + duration[j]
+                elif link == LINK_FF:
+                    bound = lf[s]
+                else:
+                    bound = lf[s] + duration[j]
+                if bound < finish:
+                    finish = bound
+            late_start = finish - duration[j]
+            if j != source and finish == lf[j] and late_start == ls[j]:
+                continue
+            if finish != lf[j] or late_start != ls[j]:
+                lf[j] = finish
+                ls[j] = late_start
+                changed.add(j)
+            for p in preds[j]:
+                if p not in queued:
+                    queued.add(p)
+                    heapq.heappush(heap, (-rank[p], p))
+        return changed
+
+    def snapshot(self) -> "CriticalPathScheduler":
+        """
+        Копия результатов расчета для чтения из фонового потока
+
+        Массивы дат копируются (пересчет одной задачи меняет их на месте),
+        а списки ID и позиций при пересчете заменяются целиком, поэтому
+        используются совместно. Копию нельзя пересчитывать.
+        """
+        copy = CriticalPathScheduler.__new__(CriticalPathScheduler)
+        copy._clear()
+        copy.task_manager = self.task_manager
+        copy.has_cycle = self.has_cycle
+        copy.project_finish = self.project_finish
+        copy._ids, copy._pos = self._ids, self._pos
+        copy._es, copy._ef = array('l', self._es), array('l', self._ef)
+        copy._ls, copy._lf = array('l', self._ls), array('l', self._lf)
+        return copy
+
+    def get(self, task_id: str) -> Optional[TaskSchedule]:
+        """Получить расписание задачи (None, если не рассчитано)"""
+        i = self._pos.get(task_id)
+        if i is None:
+            return None
+        total_float = self._ls[i] - self._es[i]
+        return TaskSchedule(
+            early_start=format_date_ordinal(self._es[i]),
+            early_finish=format_date_ordinal(max(self._es[i], self._ef[i] - 1)),
+            late_start=format_date_ordinal(self._ls[i]),
+            late_finish=format_date_ordinal(max(self._ls[i], self._lf[i] - 1)),
+            total_float=total_float,
+            is_critical=total_float <= 0
+        )
+
+    def get_float(self, task_id: str) -> Optional[int]:
+        """Получить общий резерв задачи в днях"""
+        i = self._pos.get(task_id)
+        if i is None:
+            return None
+        return self._ls[i] - self._es[i]
+
+    def get_critical_path(self) -> List[str]:
+        """ID критических задач в порядке раннего старта"""
+        critical = [i for i in range(len(self._ids)) if self._ls[i] <= self._es[i]]
+        critical.sort(key=lambda i: (self._es[i], self._ef[i]))
+        return [self._ids[i] for i in critical]
@@ -0,0 +1,465 @@
+"""
+Хранилище задач в базе SQLite
+"""
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from datetime import datetime
+from models import Task, TaskManager, parse_date_ordinal, parse_dependency_id
+from storage import BaseStorage, DataStorage
+
+
+# Версия схемы базы (в таблице meta, ключ "version")
+SCHEMA_VERSION = "2.0"
+
+# Версии JSON-формата, которые можно перенести в базу
+SUPPORTED_JSON_VERSIONS = ("1.0",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    object TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    start_ordinal INTEGER,
+    end_ordinal INTEGER,
+    duration INTEGER NOT NULL,
+    type TEXT NOT NULL DEFAULT '',
+    dep_count INTEGER NOT NULL DEFAULT 0,
+    search_text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    task_id TEXT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    depends_on TEXT NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (task_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position);
+CREATE INDEX IF NOT EXISTS idx_tasks_start ON tasks(start_ordinal);
+CREATE INDEX IF NOT EXISTS idx_tasks_end ON tasks(end_ordinal);
+CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks(type);
+CREATE INDEX IF NOT EXISTS idx_dependencies_depends_on ON dependencies(depends_on);
+"""
+
+_TASK_COLUMNS = ("id, position, object, start_date, end_date, start_ordinal, "
+                 "end_ordinal, duration, type, dep_count, search_text")
+
+
+def _version_key(version: str) -> tuple:
+    """Версия '2.0' как кортеж чисел для сравнения"""
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
+
+
+def _task_row(data: dict, position: int) -> tuple:
+    """Строка таблицы tasks из словаря Task.to_dict"""
+    return (
+        data["id"],
+        position,
+        data["object"],
+        data["start_date"],
+        data["end_date"],
+        parse_date_ordinal(data["start_date"]),
+        parse_date_ordinal(data["end_date"]),
+        data["duration"],
+        data["type"] or "",
+        len(data["dependencies"]),
+        # Тот же текст, что ищет TaskFilterIndex
+        f"{data['id'].lower()}\x00{data['object'].lower()}"
+    )
+
+
+def _dependency_rows(data: dict) -> List[tuple]:
+    """Строки таблицы dependencies для задачи"""
+    return [(data["id"], position, parse_dependency_id(label), label)
+            for position, label in enumerate(data["dependencies"])]
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище задач в базе SQLite
+
+    Задачи лежат в таблице tasks, зависимости - в отдельной таблице ребер.
+    После attach() хранилище наблюдает за TaskManager и при сохранении
+    записывает одной транзакцией только измененные строки. Порядок задач
+    хранится в колонке position (номера могут идти с пропусками).
+    """
+
+    def __init__(self, filename: str = "project_data.db"):
+        self.filename = filename
+        self.filepath = Path.cwd() / filename
+        self.task_manager: Optional[TaskManager] = None
+        # Изменения с последнего сохранения
+        self._positions: Dict[str, int] = {}
+        self._next_position = 0
+        self._changed: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._full_rewrite = True
+        self._write_lock = threading.Lock()
+        # Схема создается при первой записи, а не при каждом соединении
+        self._schema_ready = False
+        # Соединения только для чтения, по одному на поток (запросы фильтров);
+        # все открытые хранятся в списке, чтобы detach() мог их закрыть
+        self._readers = threading.local()
+        self._open_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # Позиции задач, прочитанных последним load_tasks
+        self._loaded_positions: Dict[str, int] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Открыть соединение для записи (создает базу и схему при первой записи)
+
+        Если база исчезла после создания схемы, она создается заново;
+        записать в нее только изменения нельзя - будет ошибка и следующая
+        запись станет полной.
+        """
+        exists = self.filepath.exists()
+        connection = sqlite3.connect(self.filepath)
+        connection.execute("PRAGMA foreign_keys = ON")
+        if not self._schema_ready or not exists:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(_SCHEMA)
+            self._schema_ready = True
+        return connection
+
+    def _connect_read(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Открыть соединение только для чтения (ошибка, если базы нет)"""
+        return sqlite3.connect(f"{self.filepath.as_uri()}?mode=ro", uri=True,
+                               check_same_thread=check_same_thread)
+
+    def _reader(self) -> sqlite3.Connection:
+        """Соединение для чтения текущего потока (переиспользуется)"""
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            # Закрывается из потока UI в detach()
+            connection = self._connect_read(check_same_thread=False)
+            self._readers.connection = connection
+            with self._readers_lock:
+                self._open_readers.append(connection)
+        return connection
+
+    def _close_readers(self):
+        """Закрыть соединения для чтения всех потоков"""
+        with self._readers_lock:
+            readers, self._open_readers = self._open_readers, []
+        for connection in readers:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+
+    def attach(self, task_manager: TaskManager):
+        """
+        Отслеживать изменения задач для инкрементального сохранения
+
+        Если в TaskManager те же задачи и в том же порядке, что прочитал
+        load_tasks, база уже актуальна и следующая запись будет
+        инкрементальной; иначе - полной.
+        """
+        self.task_manager = task_manager
+        loaded = self._loaded_positions
+        if len(loaded) == len(task_manager) and \
+                all(a == b for a, b in zip(loaded, (task.id for task in task_manager.iter_tasks()))):
+            self._positions = dict(loaded)
+            self._next_position = max(loaded.values(), default=-1) + 1
+            self._changed.clear()
+            self._deleted.clear()
+            self._full_rewrite = False
+        else:
+            self._reset_positions(task_manager.iter_tasks())
+        self._loaded_positions = {}
+        task_manager.add_observer(self)
+
+    def detach(self):
+        """Прекратить отслеживание изменений"""
+        if self.task_manager is not None:
+            self.task_manager.remove_observer(self)
+            self.task_manager = None
+        self._full_rewrite = True
+        self._close_readers()
+
+    def _reset_positions(self, tasks: Iterable[Task]):
+        """Пронумеровать задачи заново; следующая запись будет полной"""
+        self._positions = {task.id: position for position, task in enumerate(tasks)}
+        self._next_position = len(self._positions)
+        self._changed.clear()
+        self._deleted.clear()
+        self._full_rewrite = True
+
+    # Наблюдатель TaskManager
+
+    def on_task_added(self, task: Task):
+        self._positions[task.id] = self._next_position
+        self._next_position += 1
+        self._changed.add(task.id)
+        self._deleted.discard(task.id)
+
+    def on_task_removed(self, task: Task):
+        self._positions.pop(task.id, None)
+        self._changed.discard(task.id)
+        self._deleted.add(task.id)
+
+    def on_task_updated(self, old_id: str, task: Task):
+        if old_id != task.id:
+            self._positions[task.id] = self._positions.pop(old_id, self._next_position)
+            self._changed.discard(old_id)
+            self._deleted.add(old_id)
+            self._deleted.discard(task.id)
+        self._changed.add(task.id)
+
+    def on_tasks_reset(self, tasks: List[Task]):
+        self._reset_positions(tasks)
+
+    # Запись
+
+    def snapshot(self, tasks: Iterable[Task]) -> dict:
+        """
+        Снять изменения для записи (вызывается в потоке UI)
+
+        Без отслеживания или после сброса данных снимок содержит все задачи.
+        """
+        if self.task_manager is None or self._full_rewrite:
+            tasks = list(tasks)
+            self._reset_positions(tasks)
+            self._full_rewrite = False
+            return {
+                "full": True,
+                "upsert": [(task.to_dict(), position)
+                           for position, task in enumerate(tasks)],
+                "delete": []
+            }
+
+        get_task = self.task_manager.get_task_by_id
+        upsert = []
+        for task_id in self._changed:
+            task = get_task(task_id)
+            if task is not None:
+                upsert.append((task.to_dict(), self._positions[task_id]))
+        data = {"full": False, "upsert": upsert, "delete": list(self._deleted)}
+        self._changed.clear()
+        self._deleted.clear()
+        return data
+
+    def write_snapshot(self, data: dict) -> Optional[int]:
+        """
+        Применить снимок одной транзакцией
+
+        Returns:
+            int: число записанных и удаленных строк задач или None при ошибке
+        """
+        try:
+            with self._write_lock:
+                if not data["full"] and not self.filepath.exists():
+                    raise FileNotFoundError(f"База {self.filepath.name} не найдена")
+                connection = self._connect()
+                try:
+                    with connection:
+                        self._apply(connection, data)
+                finally:
+                    connection.close()
+            return len(data["upsert"]) + len(data["delete"])
+        except Exception as e:
+            print(f"Ошибка при сохранении в SQLite: {e}")
+            # Неизвестно, что попало в базу: в следующий раз пишем все
+            self._full_rewrite = True
+            return None
+
+    @staticmethod
+    def _apply(connection: sqlite3.Connection, data: dict):
+        """Записать изменения (внутри транзакции)"""
+        if data["full"]:
+            connection.execute("DELETE FROM dependencies")
+            connection.execute("DELETE FROM tasks")
+
+        deleted = [(task_id,) for task_id in data["delete"]]
+        changed = [(task_data["id"],) for task_data, _ in data["upsert"]]
+        connection.executemany("DELETE FROM dependencies WHERE task_id = ?",
+                               deleted + changed)
+        connection.executemany("DELETE FROM tasks WHERE id = ?", deleted)
+
+        connection.executemany(
+            f"INSERT OR REPLACE INTO tasks ({_TASK_COLUMNS}) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_task_row(task_data, position) for task_data, position in data["upsert"]]
+        )
+        connection.executemany(
+            "INSERT INTO dependencies (task_id, position, depends_on, label) "
+            "VALUES (?, ?, ?, ?)",
+            [row for task_data, _ in data["upsert"] for row in _dependency_rows(task_data)]
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("version", SCHEMA_VERSION),
+             ("saved_at", datetime.now().strftime("%d.%m.%Y %H:%M:%S"))]
+        )
+
+    # Чтение
+
+    def load_tasks(self) -> Optional[List[Task]]:
+        """Загрузить задачи из базы"""
+        if not self.filepath.exists():
+            return None
+
+        try:
+            connection = self._connect_read()
+            try:
+                version = self.schema_version(connection)
+                if version is not None and _version_key(version) > _version_key(SCHEMA_VERSION):
+                    print(f"Неподдерживаемая версия базы: {version}")
+                    return None
+
+                dependencies: Dict[str, List[str]] = {}
+                for task_id, label in connection.execute(
+                        "SELECT task_id, label FROM dependencies ORDER BY task_id, position"):
+                    dependencies.setdefault(task_id, []).append(label)
+
+                tasks = []
+                positions: Dict[str, int] = {}
+                for row in connection.execute(
+                        "SELECT id, object, start_date, end_date, duration, type, position "
+                        "FROM tasks ORDER BY position"):
+                    tasks.append(Task(
+                        id=row[0],
+                        object=row[1],
+                        start_date=row[2],
+                        end_date=row[3],
+                        duration=row[4],
+                        dependencies=dependencies.get(row[0]),
+                        type=row[5]
+                    ))
+                    positions[row[0]] = row[6]
+                self._loaded_positions = positions
+                return tasks
+            finally:
+                connection.close()
+        except Exception as e:
+            print(f"Ошибка при загрузке из SQLite: {e}")
+            return None
+
+    @staticmethod
+    def schema_version(connection: sqlite3.Connection) -> Optional[str]:
+        """Версия схемы, записанная в базе"""
+        row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def file_exists(self) -> bool:
+        """Проверить существование базы"""
+        return self.filepath.exists()
+
+    def query_ids(self, filters: dict) -> Optional[Set[str]]:
+        """
+        Выполнить фильтры FilterPanelView запросом к базе
+
+        Семантика совпадает с TaskFilterIndex.query.
+
+        Returns:
+            set: подходящие ID или None, если фильтры ничего не ограничивают
+        """
+        conditions = []
+        params = []
+
+        search_text = filters.get('search', '')
+        if search_text:
+            conditions.append("instr(search_text, ?) > 0")
+            params.append(search_text)
+
+        dep_type = filters.get('type', 'Все')
+        if dep_type == 'Без типа':
+            conditions.append("type IN ('', '--')")
+        elif dep_type != 'Все':
+            conditions.append("type = ?")
+            params.append(dep_type)
+
+        deps_filter = filters.get('dependencies', 'Все')
+        if deps_filter == 'Без зависимостей':
+            conditions.append("dep_count = 0")
+        elif deps_filter == 'С зависимостями':
+            conditions.append("dep_count > 0")
+        elif deps_filter == '1 зависимость':
+            conditions.append("dep_count = 1")
+        elif deps_filter == '2+ зависимости':
+            conditions.append("dep_count >= 2")
+
+        if filters.get('date_enabled', False):
+            filter_start = parse_date_ordinal(filters.get('start_date') or "")
+            filter_end = parse_date_ordinal(filters.get('end_date') or "")
+            if filter_start is not None and filter_end is not None:
+                conditions.append("start_ordinal <= ? AND end_ordinal >= ?")
+                params += [filter_end, filter_start]
+
+        if not conditions:
+            return None
+
+        try:
+            rows = self._reader().execute(
+                "SELECT id FROM tasks WHERE " + " AND ".join(conditions), params
+            )
+            return {row[0] for row in rows}
+        except sqlite3.Error:
+            # Следующий запрос откроет соединение заново
+            self._close_reader()
+            raise
+
+    def _close_reader(self):
+        """Закрыть соединение для чтения текущего потока"""
+        connection = getattr(self._readers, "connection", None)
+        if connection is not None:
+            self._readers.connection = None
+            with self._readers_lock:
+                if connection in self._open_readers:
+                    self._open_readers.remove(connection)
+            connection.close()
+
+
+def migrate_json_to_sqlite(json_filename: str, db_filename: str) -> tuple[bool, str]:
+    """
+    Перенести проект из JSON файла в базу SQLite
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    source = DataStorage(json_filename)
+    tasks = source.load_tasks()
+    if tasks is None:
+        return False, f"Не удалось прочитать файл: {json_filename}"
+    if source.format_version is not None and \
+            source.format_version not in SUPPORTED_JSON_VERSIONS:
+        return False, f"Неподдерживаемая версия файла: {source.format_version}"
+
+    target = SQLiteStorage(db_filename)
+    if not target.save_tasks(tasks):
+        return False, f"Не удалось записать базу: {db_filename}"
+
+    connection = target._connect()
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ("migrated_from", f"{source.filepath.name} (версия {source.format_version})")
+            )
+    finally:
+        connection.close()
+    return True, f"Перенесено задач: {len(tasks)}"
+
+
+def export_sqlite_to_json(db_filename: str, json_filename: str) -> tuple[bool, str]:
+    """
+    Выгрузить проект из базы SQLite в JSON файл текущей версии
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    tasks = SQLiteStorage(db_filename).load_tasks()
+    if tasks is None:
+        return False, f"Не удалось прочитать базу: {db_filename}"
+    if not DataStorage(json_filename).save_tasks(tasks):
+        return False, f"Не удалось записать файл: {json_filename}"
+    return True, f"Выгружено задач: {len(tasks)}"
+
@@ -2,68 +2,663 @@
 Модуль для сохранения/загрузки данных и экспорта в Excel
 """
 import json
+import multiprocessing
 import os
+import re
+import queue
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from datetime import date, datetime
 from models import Task, TaskManager
 
 
-class DataStorage:
-    """Класс для работы с хранением данных"""
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Символы, которыми может продолжаться число JSON
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
 
-    def __init__(self, filename: str = "project_data.json"):
+
+class _JsonStream:
+    """Разбор JSON по частям файла: значения читаются по одному"""
+
+    def __init__(self, file, chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Дочитать следующую часть файла (False в конце файла)"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Разобранное начало буфера больше не нужно
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий значащий символ ('' в конце файла)"""
+        while True:
+            buffer = self._buffer
+            size = len(buffer)
+            pos = self._pos
+            while pos < size and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < size:
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def skip(self, char: str):
+        """Пропустить ожидаемый символ"""
+        if self.peek() != char:
+            raise ValueError(f"Ожидался символ {char!r} в позиции {self._pos}")
+        self._pos += 1
+
+    def value(self):
+        """Прочитать следующее значение целиком"""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if self._may_continue(value, end) and self._fill():
+                # Число могло оборваться на границе части - разбираем заново
+                continue
+            self._pos = end
+            return value
+
+
+    def _may_continue(self, value, end: int) -> bool:
+        """
+        Может ли значение продолжиться в следующей части файла
+
+        Для числа, оборванного после '.', 'e' или знака, raw_decode
+        возвращает более короткое число ('0' из '0.'), поэтому остаток
+        буфера из символов числа тоже означает незаконченное значение.
+        """
+        tail = self._buffer[end:]
+        if not tail:
+            return True
+        return (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and all(char in _NUMBER_CHARS for char in tail))
+
+
+def iter_json_array(file, key: str, meta: dict,
+                    chunk_size: int = 1 << 16) -> Iterator:
+    """
+    Разобрать объект JSON верхнего уровня, выдавая элементы массива key
+
+    Элементы массива выдаются по одному без загрузки всего файла;
+    остальные поля объекта складываются в meta.
+    """
+    stream = _JsonStream(file, chunk_size)
+    stream.skip("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        name = stream.value()
+        stream.skip(":")
+        if name == key and stream.peek() == "[":
+            stream.skip("[")
+            if stream.peek() != "]":
+                while True:
+                    yield stream.value()
+                    if stream.peek() != ",":
+                        break
+                    stream.skip(",")
+            stream.skip("]")
+        else:
+            meta[name] = stream.value()
+        if stream.peek() != ",":
+            break
+        stream.skip(",")
+    stream.skip("}")
+
+
+class BaseStorage(ABC):
+    """
+    Интерфейс хранилища задач
+
+    Запись состоит из двух шагов: snapshot() в потоке UI снимает данные
+    для записи, write_snapshot() может выполняться в фоновом потоке.
+    journal - подключенный журнал изменений (ChangeJournal) или None.
+    """
+
+    journal = None
+
+    def save_tasks(self, tasks: Iterable[Task]) -> bool:
+        """Сохранить задачи"""
+        return self.write_snapshot(self.snapshot(tasks)) is not None
+
+    @abstractmethod
+    def snapshot(self, tasks: Iterable[Task]) -> dict:
+        """Снять копию данных для записи (вызывается в потоке UI)"""
+
+    @abstractmethod
+    def write_snapshot(self, data: dict) -> Optional[int]:
+        """
+        Записать снимок
+
+        Returns:
+            int: объем записанных данных в байтах или None при ошибке
+        """
+
+    @abstractmethod
+    def load_tasks(self) -> Optional[List[Task]]:
+        """Загрузить задачи"""
+
+    @abstractmethod
+    def file_exists(self) -> bool:
+        """Проверить существование хранилища"""
+
+
+class DataStorage(BaseStorage):
+    """
+    Хранилище задач в JSON файле
+
+    Запись атомарная: данные пишутся во временный файл в том же каталоге,
+    сбрасываются на диск и переименовываются поверх основного файла.
+    Предыдущие версии хранятся как <файл>.1 ... <файл>.N (1 - самая новая).
+    Изменения между снимками дописываются в журнал <файл>.wal (см.
+    ChangeJournal) и применяются к снимку при загрузке.
+    """
+
+    # Версия формата файла (поле "version")
+    FORMAT_VERSION = "1.0"
+
+    def __init__(self, filename: str = "project_data.json", generations: int = 3):
         self.filename = filename
         self.filepath = Path.cwd() / filename
+        self.generations = generations
+        self.journal_path = self.filepath.with_name(f"{self.filepath.name}.wal")
+        # Подключенный журнал изменений (ChangeJournal) или None
+        self.journal = None
+        # Результат последней загрузки: файл, из которого пришлось
+        # восстановить данные, номер последней записи журнала и число
+        # примененных записей
+        self.recovered_from: Optional[Path] = None
+        self.journal_seq = 0
+        self.replayed_records = 0
+        # Журнал не удалось применить: он не продолжает загруженный снимок
+        self.journal_gap = False
+        self.format_version: Optional[str] = None
+        # Запись может идти из фонового потока автосохранения
+        self._write_lock = threading.Lock()
 
-    def save_tasks(self, tasks: List[Task]) -> bool:
-        """Сохранить задачи в JSON файл"""
-        try:
-            data = {
-                "version": "1.0",
-                "saved_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
-                "tasks": [task.to_dict() for task in tasks]
-            }
+    def generation_path(self, number: int) -> Path:
+        """Путь к предыдущей версии файла (1 - самая новая)"""
+        return self.filepath.with_name(f"{self.filepath.name}.{number}")
 
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def snapshot(self, tasks: Iterable[Task]) -> dict:
+        """Снять копию данных проекта для записи (вызывается в потоке UI)"""
+        data = {
+            "version": self.FORMAT_VERSION,
+            "saved_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+        }
+        if self.journal is not None:
+            # Записи журнала до этого номера уже вошли в снимок; номер
+            # пишется перед задачами, чтобы его можно было прочитать
+            # по началу файла (см. snapshot_seq)
+            data["journal_seq"] = self.journal.seq
+        data["tasks"] = [task.to_dict() for task in tasks]
+        return data
 
-            return True
+    def write_snapshot(self, data: dict) -> Optional[int]:
+        """
+        Закодировать снимок в JSON и записать на диск с fsync
+
+        Returns:
+            int: размер записанного файла в байтах или None при ошибке
+        """
+        try:
+            payload = self._encode(data)
+            with self._write_lock:
+                self._write_atomic(payload)
+            if self.journal is not None and "journal_seq" in data:
+                self.journal.compact(self._journal_keep_seq(data["journal_seq"]))
+            return len(payload)
         except Exception as e:
             print(f"Ошибка при сохранении: {e}")
-            return False
+            return None
 
-    def load_tasks(self) -> Optional[List[Task]]:
-        """Загрузить задачи из JSON файла"""
-        if not self.filepath.exists():
+    def _journal_keep_seq(self, snapshot_seq: int) -> int:
+        """
+        Номер, до которого журнал можно сократить после записи снимка
+
+        Записи нужны начиная со снимка самой старой хранимой версии: при
+        восстановлении из нее журнал применяется поверх, и без этих
+        записей потерялись бы все изменения после нее.
+        """
+        keep = snapshot_seq
+        for number in range(1, self.generations + 1):
+            path = self.generation_path(number)
+            if path.exists():
+                seq = self.snapshot_seq(path)
+                if seq is not None:
+                    keep = min(keep, seq)
+        return keep
+
+    def snapshot_seq(self, path: Path) -> Optional[int]:
+        """
+        Номер записи журнала, вошедшей в снимок файла
+
+        Обычно читается только начало файла. В файлах, где journal_seq
+        записан после задач, файл дочитывается до конца.
+
+        Returns:
+            int: номер записи (0, если его нет) или None, если файл не читается
+        """
+        meta = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for _ in iter_json_array(f, "tasks", meta):
+                    if "journal_seq" in meta:
+                        break
+        except Exception:
             return None
+        return meta.get("journal_seq", 0)
+
+    @staticmethod
+    def _encode(data: dict) -> bytes:
+        """Закодировать снимок в байты файла"""
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
 
+    def _write_atomic(self, payload: bytes):
+        """Записать через временный файл, сдвинуть версии и подменить файл"""
+        directory = self.filepath.parent
+        fd, temp_name = tempfile.mkstemp(
+            dir=directory, prefix=f".{self.filepath.name}.", suffix=".tmp"
+        )
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self._rotate_generations()
+            os.replace(temp_name, self.filepath)
+        except BaseException:
+            try:
+                os.remove(temp_name)
+            except OSError:
+                pass
+            raise
+        self._fsync_directory(directory)
 
-            tasks = [Task.from_dict(task_data) for task_data in data.get("tasks", [])]
-            return tasks
+    def _rotate_generations(self):
+        """Сдвинуть предыдущие версии: основной -> .1 -> .2 ... -> .N"""
+        if self.generations <= 0 or not self.filepath.exists():
+            return
+        for number in range(self.generations - 1, 0, -1):
+            source = self.generation_path(number)
+            if source.exists():
+                os.replace(source, self.generation_path(number + 1))
+        os.replace(self.filepath, self.generation_path(1))
+
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        """Сбросить на диск запись каталога (переименование)"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def load_tasks(self) -> Optional[List[Task]]:
+        """
+        Загрузить задачи из JSON файла
+
+        Если основной файл отсутствует или поврежден, данные берутся из
+        самой новой читаемой предыдущей версии (см. recovered_from).
+        Затем к снимку применяются более новые записи журнала.
+        """
+        self.recovered_from = None
+        self.replayed_records = 0
+        for path in self._candidate_paths():
+            loaded = self._load_file(path)
+            if loaded is not None:
+                if path != self.filepath:
+                    self.recovered_from = path
+                    print(f"Данные восстановлены из {path.name}")
+                tasks, snapshot_seq, self.format_version = loaded
+                return self._replay_journal(tasks, snapshot_seq)
+        if self.journal_path.exists():
+            # Снимка еще нет: проект целиком в журнале
+            return self._replay_journal([], 0)
+        return None
+
+    def _candidate_paths(self) -> List[Path]:
+        """Существующие файлы данных: основной, затем версии от новой к старой"""
+        paths = [self.filepath] + [self.generation_path(number)
+                                   for number in range(1, self.generations + 1)]
+        return [path for path in paths if path.exists()]
+
+    def stream_tasks(self, path: Optional[Path] = None,
+                     meta: Optional[dict] = None) -> Iterator[Task]:
+        """
+        Лениво читать задачи из JSON файла по одной
+
+        Файл разбирается по частям, поэтому в памяти не держится ни весь
+        текст, ни полное дерево словарей. Остальные поля файла (version,
+        journal_seq, ...) попадают в meta по мере чтения. Журнал изменений
+        не применяется (см. replay_journal_into).
+        """
+        if meta is None:
+            meta = {}
+        with open(path or self.filepath, 'r', encoding='utf-8') as f:
+            for task_data in iter_json_array(f, "tasks", meta):
+                yield Task.from_dict(task_data)
+
+    def _load_file(self, path: Path) -> Optional[tuple]:
+        """
+        Прочитать задачи из одного файла
+
+        Returns:
+            tuple: (задачи, номер записи журнала в снимке, версия формата)
+            или None при ошибке
+        """
+        try:
+            meta = {}
+            tasks = list(self.stream_tasks(path, meta))
+            return tasks, meta.get("journal_seq", 0), meta.get("version", "1.0")
         except Exception as e:
-            print(f"Ошибка при загрузке: {e}")
+            print(f"Ошибка при загрузке {path.name}: {e}")
             return None
 
+    @staticmethod
+    def read_journal(path: Path) -> List[dict]:
+        """Прочитать записи журнала (оборванная последняя запись отбрасывается)"""
+        records = []
+        if not path.exists():
+            return records
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def _pending_journal(self, snapshot_seq: int) -> List[dict]:
+        """Записи журнала, сделанные после снимка с номером snapshot_seq"""
+        self.journal_gap = False
+        try:
+            records = self.read_journal(self.journal_path)
+        except Exception as e:
+            print(f"Ошибка чтения журнала: {e}")
+            records = []
+        self.journal_seq = max([snapshot_seq] + [record["seq"] for record in records])
+        pending = [record for record in records if record["seq"] > snapshot_seq]
+        if pending and pending[0]["seq"] != snapshot_seq + 1:
+            # Между снимком и журналом есть разрыв (снимок из старой версии)
+            print("Журнал изменений не продолжает снимок и не будет применен")
+            self.journal_gap = True
+            return []
+        return pending
+
+    def _replay_journal(self, tasks: List[Task], snapshot_seq: int) -> List[Task]:
+        """Применить к снимку записи журнала, сделанные после него"""
+        pending = self._pending_journal(snapshot_seq)
+        if not pending:
+            return tasks
+
+        manager = TaskManager()
+        manager.replace_all(tasks)
+        for record in pending:
+            self._apply_record(manager, record)
+        self.replayed_records = len(pending)
+        return manager.get_all_tasks()
+
+    def replay_journal_into(self, manager: TaskManager, snapshot_seq: int) -> int:
+        """
+        Применить записи журнала после снимка прямо к TaskManager
+        (для задач, загруженных через stream_tasks)
+
+        Returns:
+            int: число примененных записей
+        """
+        pending = self._pending_journal(snapshot_seq)
+        for record in pending:
+            self._apply_record(manager, record)
+        self.replayed_records = len(pending)
+        return self.replayed_records
+
+    @staticmethod
+    def _apply_record(manager: TaskManager, record: dict):
+        """Применить одну запись журнала"""
+        op = record.get("op")
+        if op == "add":
+            manager.add_task(Task.from_dict(record["task"]))
+        elif op == "update":
+            index = manager.index_of(record["id"])
+            if index is not None:
+                manager.update_task(index, Task.from_dict(record["task"]))
+        elif op == "delete":
+            manager.remove_task(record["id"])
+        elif op == "reset":
+            manager.replace_all([Task.from_dict(data) for data in record["tasks"]])
+
     def file_exists(self) -> bool:
-        """Проверить существование файла данных"""
-        return self.filepath.exists()
+        """Проверить существование файла данных (версий или журнала)"""
+        return bool(self._candidate_paths()) or self.journal_path.exists()
+
+
+def open_storage(filename: str) -> BaseStorage:
+    """Выбрать хранилище по расширению файла"""
+    suffix = Path(filename).suffix.lower()
+    if suffix in (".db", ".sqlite", ".sqlite3"):
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(filename)
+    if suffix == ".prjb":
+        from binary_storage import BinaryStorage
+        return BinaryStorage(filename)
+    return DataStorage(filename)
+
+
+class ChangeJournal:
+    """
+    Журнал изменений (write-ahead log) между полными снимками
+
+    Наблюдатель TaskManager: каждое изменение сразу дописывается в
+    <файл>.wal одной JSON-строкой с возрастающим номером и сбрасывается
+    на диск. Полный снимок запоминает номер последней вошедшей в него
+    записи; после его записи журнал сокращается до более новых записей.
+    """
+
+    # Размер журнала, после которого автосохранение пишет полный снимок
+    COMPACT_BYTES = 1024 * 1024
+
+    def __init__(self, storage: DataStorage, task_manager: TaskManager):
+        self.storage = storage
+        self.path = storage.journal_path
+        self.seq = storage.journal_seq
+        self._lock = threading.Lock()
+        self._file = None
+        self.task_manager = task_manager
+        self._truncate_partial_record()
+        storage.journal = self
+        task_manager.add_observer(self)
+
+    def _truncate_partial_record(self):
+        """Отрезать оборванную при сбое последнюю запись"""
+        try:
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ошибка проверки журнала: {e}")
+
+    def close(self):
+        """Отключить журнал от TaskManager и закрыть файл"""
+        self.task_manager.remove_observer(self)
+        with self._lock:
+            self._close_file()
+            # Новый журнал этого хранилища продолжит нумерацию
+            self.storage.journal_seq = self.seq
+        if self.storage.journal is self:
+            self.storage.journal = None
+
+    def _close_file(self):
+        """Закрыть файл журнала (вызывается под блокировкой)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, record: dict):
+        """Дописать запись и сбросить ее на диск"""
+        with self._lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(line + "\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                print(f"Ошибка записи журнала: {e}")
+
+    def size(self) -> int:
+        """Размер журнала в байтах"""
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def needs_compaction(self) -> bool:
+        """Пора ли свернуть журнал в полный снимок"""
+        return self.size() >= self.COMPACT_BYTES
+
+    def compact(self, snapshot_seq: int):
+        """Удалить записи, вошедшие в снимок с номером snapshot_seq"""
+        with self._lock:
+            self._close_file()
+            try:
+                records = [record for record in self.storage.read_journal(self.path)
+                           if record["seq"] > snapshot_seq]
+                if not records:
+                    if self.path.exists():
+                        os.remove(self.path)
+                    return
+                temp_path = self.path.with_name(self.path.name + ".tmp")
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False,
+                                           separators=(",", ":")) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except Exception as e:
+                print(f"Ошибка сжатия журнала: {e}")
+
+    # Наблюдатель TaskManager
+
+    def on_task_added(self, task: Task):
+        self._append({"op": "add", "task": task.to_dict()})
+
+    def on_task_removed(self, task: Task):
+        self._append({"op": "delete", "id": task.id})
+
+    def on_task_updated(self, old_id: str, task: Task):
+        self._append({"op": "update", "id": old_id, "task": task.to_dict()})
+
+    def on_tasks_reset(self, tasks: List[Task]):
+        self._append({"op": "reset", "tasks": [task.to_dict() for task in tasks]})
+
+
+def wbs_prefix(task_id: str, depth: int) -> str:
+    """Префикс ID задачи из depth частей через дефис (WBS-01-13-001, 2 -> WBS-01)"""
+    return "-".join(task_id.split("-")[:depth])
+
+
+class ExportCancelled(Exception):
+    """Экспорт отменен пользователем"""
 
 
 class ExcelExporter:
     """Класс для экспорта данных в Excel"""
 
+    # Начиная с этого числа задач экспорт идет в потоковом режиме
+    STREAMING_THRESHOLD = 5000
+    # Через сколько строк сообщать о прогрессе и проверять отмену
+    PROGRESS_STEP = 500
+
+    HEADERS = ["ID", "Объект", "Дата начала", "Дата окончания",
+               "Длительность", "Зависимости", "Тип зависимости"]
+    SCHEDULE_HEADERS = ["Ранний старт", "Ранний финиш", "Поздний старт",
+                        "Поздний финиш", "Резерв", "Критическая"]
+    COLUMN_WIDTHS = [18, 30, 15, 15, 12, 35, 20]
+    SCHEDULE_COLUMN_WIDTHS = [15, 15, 15, 15, 10, 12]
+    # Колонки с выравниванием влево (объект, зависимости), с 1
+    LEFT_ALIGNED_COLUMNS = (2, 6)
+
+    # Лист диаграммы Гантта: шаг шкалы в днях
+    GANTT_BUCKET_DAYS = {"day": 1, "week": 7}
+    # Режим "auto" переходит на недели, если проект длиннее этого числа дней
+    GANTT_AUTO_DAY_LIMIT = 366
+    # Предел столбцов Excel за вычетом колонок ID и объекта
+    GANTT_MAX_BUCKETS = 16384 - 2
+    # Интервал проверки отмены при параллельном экспорте, с
+    PARTITION_WAIT_SECONDS = 0.1
+    # Больше разделов - вероятно, глубина префикса выбрана слишком большой
+    PARTITION_LIMIT = 1000
+
     @staticmethod
-    def export_to_excel(tasks: List[Task], filename: Optional[str] = None) -> tuple[bool, str]:
+    def export_to_excel(tasks: List[Task], filename: Optional[str] = None,
+                        schedule=None, streaming: Optional[bool] = None,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        gantt: Optional[str] = None) -> tuple[bool, str]:
         """
         Экспортировать задачи в Excel файл
+
+        Если передан schedule (CriticalPathScheduler), добавляются колонки
+        раннего/позднего старта и финиша, резерва и признака критичности.
+        streaming=None выбирает потоковый режим для больших проектов
+        (см. export_to_excel_streaming). progress(записано, всего)
+        вызывается каждые PROGRESS_STEP строк; установленный cancel_event
+        прерывает экспорт до записи файла. gantt ("day", "week" или
+        "auto") добавляет лист диаграммы Гантта; он пишется только
+        в потоковом режиме.
         
         Returns:
             tuple: (success: bool, message: str)
         """
+        if gantt is not None:
+            streaming = True
+        if streaming is None:
+            streaming = len(tasks) > ExcelExporter.STREAMING_THRESHOLD
+        if streaming:
+            return ExcelExporter.export_to_excel_streaming(
+                tasks, filename, schedule, progress, cancel_event, gantt
+            )
+
         try:
             # Проверяем наличие openpyxl
             try:
@@ -74,8 +669,7 @@ class ExcelExporter:
 
             # Определяем имя файла
             if filename is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"project_export_{timestamp}.xlsx"
+                filename = ExcelExporter._default_filename()
 
             # Создаем книгу и лист
             wb = Workbook()
@@ -96,8 +690,7 @@ class ExcelExporter:
             left_align = Alignment(horizontal='left', vertical='center', wrap_text=True)
 
             # Заголовки
-            headers = ["ID", "Объект", "Дата начала", "Дата окончания", 
-                      "Длительность", "Зависимости", "Тип зависимости"]
+            headers = ExcelExporter._headers(schedule)
             
             for col, header in enumerate(headers, start=1):
                 cell = ws.cell(row=1, column=col, value=header)
@@ -107,24 +700,15 @@ class ExcelExporter:
                 cell.border = border
 
             # Ширина колонок
-            column_widths = [18, 30, 15, 15, 12, 35, 20]
-            for col, width in enumerate(column_widths, start=1):
+            for col, width in enumerate(ExcelExporter._column_widths(schedule), start=1):
                 ws.column_dimensions[chr(64 + col)].width = width
 
             # Данные
+            total = len(tasks)
             for row_idx, task in enumerate(tasks, start=2):
-                # Формируем текст зависимостей
-                deps_text = "\n".join(task.dependencies) if task.dependencies else "Нет"
-
-                row_data = [
-                    task.id,
-                    task.object,
-                    task.start_date,
-                    task.end_date,
-                    f"{task.duration} дней",
-                    deps_text,
-                    task.type if task.type else "--"
-                ]
+                if (row_idx - 2) % ExcelExporter.PROGRESS_STEP == 0:
+                    ExcelExporter._report(row_idx - 2, total, progress, cancel_event)
+                row_data = ExcelExporter._row_values(task, schedule)
 
                 for col, value in enumerate(row_data, start=1):
                     cell = ws.cell(row=row_idx, column=col, value=value)
@@ -132,7 +716,7 @@ class ExcelExporter:
                     cell.border = border
                     
                     # Выравнивание
-                    if col in [1, 3, 4, 5, 7]:  # ID, даты, длительность, тип
+                    if col not in ExcelExporter.LEFT_ALIGNED_COLUMNS:
                         cell.alignment = center_align
                     else:  # Объект, зависимости
                         cell.alignment = left_align
@@ -150,24 +734,491 @@ class ExcelExporter:
             ws.cell(row=info_row + 1, column=2, value=len(tasks))
 
             # Сохраняем файл
+            ExcelExporter._report(total, total, progress, cancel_event)
             wb.save(filename)
             return True, f"Данные экспортированы в файл: {filename}"
 
+        except ExportCancelled:
+            return False, "Экспорт отменен"
+        except Exception as e:
+            return False, f"Ошибка при экспорте: {str(e)}"
+
+    @staticmethod
+    def export_to_excel_streaming(tasks: Iterable[Task], filename: Optional[str] = None,
+                                  schedule=None,
+                                  progress: Optional[Callable[[int, int], None]] = None,
+                                  cancel_event: Optional[threading.Event] = None,
+                                  gantt: Optional[str] = None
+                                  ) -> tuple[bool, str]:
+        """
+        Экспортировать задачи в потоковом режиме (write-only книга openpyxl)
+
+        Строки создаются генератором и сразу пишутся в файл, оформление
+        задается общими именованными стилями, поэтому память не растет
+        с числом задач. Высота строк не подбирается. gantt добавляет
+        лист диаграммы Гантта (см. _write_gantt_sheet).
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        try:
+            try:
+                from openpyxl import Workbook
+                from openpyxl.cell import WriteOnlyCell
+                from openpyxl.styles import (Font, PatternFill, Alignment, Border,
+                                             Side, NamedStyle)
+                from openpyxl.utils import get_column_letter
+            except ImportError:
+                return False, "Библиотека openpyxl не установлена. Выполните: pip install openpyxl"
+
+            if filename is None:
+                filename = ExcelExporter._default_filename()
+
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Задачи проекта")
+
+            border = Border(
+                left=Side(style='thin', color='D0D0D0'),
+                right=Side(style='thin', color='D0D0D0'),
+                top=Side(style='thin', color='D0D0D0'),
+                bottom=Side(style='thin', color='D0D0D0')
+            )
+            styles = {
+                "task_header": NamedStyle(
+                    name="task_header",
+                    font=Font(name='Segoe UI', size=11, bold=True, color="FFFFFF"),
+                    fill=PatternFill(start_color="3B8ED0", end_color="3B8ED0", fill_type="solid"),
+                    alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+                    border=border
+                ),
+                "task_center": NamedStyle(
+                    name="task_center",
+                    font=Font(name='Segoe UI', size=10),
+                    alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+                    border=border
+                ),
+                "task_left": NamedStyle(
+                    name="task_left",
+                    font=Font(name='Segoe UI', size=10),
+                    alignment=Alignment(horizontal='left', vertical='center', wrap_text=True),
+                    border=border
+                ),
+                "task_info": NamedStyle(name="task_info", font=Font(bold=True)),
+            }
+            for style in styles.values():
+                wb.add_named_style(style)
+
+            # Ширина колонок задается до первой строки
+            for col, width in enumerate(ExcelExporter._column_widths(schedule), start=1):
+                ws.column_dimensions[get_column_letter(col)].width = width
+
+            def styled(value, style_name: str):
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style_name
+                return cell
+
+            ws.append([styled(header, "task_header")
+                       for header in ExcelExporter._headers(schedule)])
+
+            column_styles = None
+            count = 0
+            total = len(tasks) if hasattr(tasks, "__len__") else 0
+            if gantt is not None:
+                # Лист Гантта - второй проход по тем же задачам
+                tasks = list(tasks)
+                total = 2 * len(tasks)
+            for row_data in ExcelExporter._iter_rows(tasks, schedule):
+                if count % ExcelExporter.PROGRESS_STEP == 0:
+                    ExcelExporter._report(count, total, progress, cancel_event)
+                if column_styles is None:
+                    column_styles = [
+                        "task_left" if col in ExcelExporter.LEFT_ALIGNED_COLUMNS
+                        else "task_center"
+                        for col in range(1, len(row_data) + 1)
+                    ]
+                ws.append([styled(value, style_name)
+                           for value, style_name in zip(row_data, column_styles)])
+                count += 1
+
+            ws.append([])
+            ws.append([styled("Дата экспорта:", "task_info"),
+                       datetime.now().strftime("%d.%m.%Y %H:%M:%S")])
+            ws.append([styled("Всего задач:", "task_info"), count])
+
+            if gantt is not None:
+                ws.close()
+                ws = wb.create_sheet("Гантт")
+                ExcelExporter._write_gantt_sheet(ws, wb, tasks, gantt, schedule,
+                                                 count, total, progress, cancel_event)
+
+            ExcelExporter._report(total or count, total or count, progress, cancel_event)
+            wb.save(filename)
+            return True, f"Данные экспортированы в файл: {filename}"
+
+        except ExportCancelled:
+            # Дописываем временный файл листа, чтобы закрыть его поток записи
+            if not ws.closed:
+                ws.close()
+            return False, "Экспорт отменен"
+        except Exception as e:
+            return False, f"Ошибка при экспорте: {str(e)}"
+
+    @staticmethod
+    def export_partitioned(tasks: List[Task], filename: Optional[str] = None,
+                           depth: int = 2, schedule=None, per_file: bool = False,
+                           workers: Optional[int] = None,
+                           progress: Optional[Callable[[int, int], None]] = None,
+                           cancel_event: Optional[threading.Event] = None
+                           ) -> tuple[bool, str]:
+        """
+        Экспортировать задачи на отдельные листы по префиксу ID
+
+        Задачи группируются по первым depth частям ID (см. wbs_prefix).
+        XML листов формируется параллельно в пуле процессов (xlsx_writer),
+        затем листы собираются в одну книгу; при per_file=True каждый
+        раздел записывается рабочим процессом в свой файл
+        <имя>_<префикс>.xlsx. При отмене уже записанные файлы удаляются.
+        
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        import xlsx_writer
+
+        # Файлы разделов, удаляемые, если экспорт не завершился
+        partial_files: List[str] = []
+        try:
+            if filename is None:
+                filename = ExcelExporter._default_filename()
+
+            partitions = ExcelExporter._partition(tasks, depth)
+            if not partitions:
+                return False, "Нет задач для экспорта"
+            if len(partitions) > ExcelExporter.PARTITION_LIMIT:
+                return False, (f"Слишком много разделов ({len(partitions)}): "
+                               f"уменьшите глубину префикса")
+            headers = ExcelExporter._headers(schedule)
+            widths = ExcelExporter._column_widths(schedule)
+            exported_at = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+
+            titles: Dict[str, str] = {}
+            used_titles: set = set()
+            for prefix in partitions:
+                titles[prefix] = xlsx_writer.sheet_title(prefix, used_titles)
+            filenames = ExcelExporter._partition_filenames(filename, partitions) if per_file else {}
+
+            def job_args(prefix: str, group: List[Task]) -> tuple:
+                rows = [ExcelExporter._row_values(task, schedule) for task in group]
+                footer = [("Дата экспорта:", exported_at), ("Всего задач:", len(group))]
+                args = (headers, widths, rows, ExcelExporter.LEFT_ALIGNED_COLUMNS, footer)
+                if per_file:
+                    return (filenames[prefix], titles[prefix]) + args
+                return args
+
+            render = xlsx_writer.write_sheet_file if per_file else xlsx_writer.render_sheet
+            results: Dict[str, object] = {}
+            total = len(tasks)
+            done = 0
+            ExcelExporter._report(done, total, progress, cancel_event)
+
+            if len(partitions) == 1 or workers == 1:
+                for prefix, group in partitions.items():
+                    args = job_args(prefix, group)
+                    if per_file:
+                        partial_files.append(args[0])
+                    results[prefix] = render(*args)
+                    done += len(group)
+                    ExcelExporter._report(done, total, progress, cancel_event)
+            else:
+                # spawn: процесс с Tk и фоновыми потоками нельзя безопасно копировать fork
+                context = multiprocessing.get_context("spawn")
+                submitted = {}
+                try:
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                        for prefix, group in partitions.items():
+                            submitted[pool.submit(render, *job_args(prefix, group))] = prefix
+                        pending = set(submitted)
+                        try:
+                            while pending:
+                                finished, pending = wait(
+                                    pending, ExcelExporter.PARTITION_WAIT_SECONDS,
+                                    FIRST_COMPLETED
+                                )
+                                for future in finished:
+                                    prefix = submitted[future]
+                                    results[prefix] = future.result()
+                                    done += len(partitions[prefix])
+                                ExcelExporter._report(done, total, progress, cancel_event)
+                        except BaseException:
+                            for future in pending:
+                                future.cancel()
+                            raise
+                finally:
+                    # Пул закрыт: все начатые задания завершены
+                    if per_file:
+                        partial_files += [
+                            filenames[prefix]
+                            for future, prefix in submitted.items()
+                            if not future.cancelled() and future.exception() is None
+                        ]
+
+            if per_file:
+                partial_files.clear()
+                return True, (f"Экспортировано файлов: {len(results)} "
+                              f"в папку {Path(filename).resolve().parent}")
+
+            xlsx_writer.write_workbook(
+                filename, [(titles[prefix], results[prefix]) for prefix in partitions]
+            )
+            return True, f"Данные экспортированы в файл: {filename} (листов: {len(results)})"
+
+        except ExportCancelled:
+            return False, "Экспорт отменен"
         except Exception as e:
             return False, f"Ошибка при экспорте: {str(e)}"
+        finally:
+            # Незавершенный экспорт по файлам не оставляет части разделов
+            for path in partial_files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _partition(tasks: Iterable[Task], depth: int) -> Dict[str, List[Task]]:
+        """Группы задач по префиксу ID, упорядоченные по префиксу"""
+        groups: Dict[str, List[Task]] = {}
+        for task in tasks:
+            groups.setdefault(wbs_prefix(task.id, depth), []).append(task)
+        return {prefix: groups[prefix] for prefix in sorted(groups)}
+
+    @staticmethod
+    def _partition_filenames(filename: str, prefixes: Iterable[str]) -> Dict[str, str]:
+        """
+        Имена файлов разделов: <имя>_<префикс>.xlsx рядом с filename
+
+        Недопустимые в имени символы заменяются на '_'; если разные
+        префиксы дают одно имя (A/1 и A:1), к следующим добавляется
+        номер, чтобы разделы не перезаписывали друг друга.
+        """
+        path = Path(filename)
+        suffix = path.suffix or '.xlsx'
+        used: set = set()
+        names: Dict[str, str] = {}
+        for prefix in prefixes:
+            safe_prefix = re.sub(r"[^\w.-]", "_", prefix) or "_"
+            name = f"{path.stem}_{safe_prefix}"
+            counter = 2
+            # Имена файлов в Windows не различают регистр
+            while name.lower() in used:
+                name = f"{path.stem}_{safe_prefix}_{counter}"
+                counter += 1
+            used.add(name.lower())
+            names[prefix] = str(path.with_name(name + suffix))
+        return names
+
+    @staticmethod
+    def _gantt_layout(tasks: List[Task], bucket: str) -> tuple:
+        """
+        Рассчитать полосы диаграммы Гантта одним проходом по датам задач
+
+        Returns:
+            tuple: (первый день шкалы, шаг в днях, число столбцов,
+                    первый столбец полосы, последний столбец полосы);
+                    у задачи без даты начала первый столбец равен -1
+        """
+        starts = array('l', [task.start_ordinal or 0 for task in tasks])
+        ends = array('l', [task.end_ordinal or 0 for task in tasks])
+        dated = [start for start in starts if start]
+        if not dated:
+            return 0, 1, 0, array('l', [-1] * len(tasks)), array('l', [-1] * len(tasks))
+
+        origin = min(dated)
+        last_day = max(max(starts), max(ends))
+        if bucket == "auto":
+            bucket = "day" if last_day - origin < ExcelExporter.GANTT_AUTO_DAY_LIMIT else "week"
+        step = ExcelExporter.GANTT_BUCKET_DAYS[bucket]
+        if step == 7:
+            # Недели начинаются с понедельника (день 1 - понедельник)
+            origin -= (origin - 1) % 7
+
+        limit = ExcelExporter.GANTT_MAX_BUCKETS - 1
+        first = array('l', [
+            min((start - origin) // step, limit) if start else -1
+            for start in starts
+        ])
+        last = array('l', [
+            min((max(start, end) - origin) // step, limit) if start else -1
+            for start, end in zip(starts, ends)
+        ])
+        return origin, step, max(last) + 1, first, last
+
+    @staticmethod
+    def _write_gantt_sheet(ws, wb, tasks: List[Task], bucket: str, schedule,
+                           done: int, total: int,
+                           progress: Optional[Callable[[int, int], None]],
+                           cancel_event: Optional[threading.Event]):
+        """
+        Записать лист диаграммы Гантта в write-only книгу
+
+        Полоса задачи - непрерывный ряд ячеек с общей заливкой: для всего
+        ряда используется одна ячейка со стилем, которую write-only лист
+        записывает в каждый столбец, поэтому время растет с числом
+        задач и столбцов шкалы, а формулы не нужны. Критические задачи
+        (нулевой резерв по schedule) выделяются красным.
+        """
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+        from openpyxl.utils import get_column_letter
+
+        origin, step, bucket_count, first, last = \
+            ExcelExporter._gantt_layout(tasks, bucket)
+
+        styles = [
+            NamedStyle(
+                name="gantt_scale",
+                font=Font(name='Segoe UI', size=8),
+                alignment=Alignment(horizontal='center', text_rotation=90)
+            ),
+            NamedStyle(
+                name="gantt_bar",
+                fill=PatternFill(start_color="3B8ED0", end_color="3B8ED0", fill_type="solid")
+            ),
+            NamedStyle(
+                name="gantt_critical",
+                fill=PatternFill(start_color="E04F5F", end_color="E04F5F", fill_type="solid")
+            ),
+        ]
+        for style in styles:
+            if style.name not in wb.named_styles:
+                wb.add_named_style(style)
+
+        # Ширина, высота заголовка и закрепление задаются до первой строки
+        ws.column_dimensions["A"].width = 18
+        ws.column_dimensions["B"].width = 30
+        for col in range(3, bucket_count + 3):
+            ws.column_dimensions[get_column_letter(col)].width = 3 if step == 1 else 4
+        ws.row_dimensions[1].height = 40
+        ws.freeze_panes = "C2"
+
+        def styled(value, style_name: str):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_name
+            return cell
+
+        header = [styled("ID", "task_header"), styled("Объект", "task_header")]
+        header += [
+            styled(date.fromordinal(origin + i * step).strftime("%d.%m"), "gantt_scale")
+            for i in range(bucket_count)
+        ]
+        ws.append(header)
+
+        for i, task in enumerate(tasks):
+            if i % ExcelExporter.PROGRESS_STEP == 0:
+                ExcelExporter._report(done + i, total, progress, cancel_event)
+            row = [task.id, task.object]
+            start = first[i]
+            if start >= 0:
+                task_float = schedule.get_float(task.id) if schedule is not None else None
+                critical = task_float is not None and task_float <= 0
+                bar = styled(None, "gantt_critical" if critical else "gantt_bar")
+                row += [None] * start
+                row += [bar] * (last[i] - start + 1)
+            ws.append(row)
+
+    @staticmethod
+    def _report(done: int, total: int,
+                progress: Optional[Callable[[int, int], None]],
+                cancel_event: Optional[threading.Event]):
+        """Сообщить о прогрессе; ExportCancelled, если экспорт отменен"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExportCancelled()
+        if progress is not None:
+            progress(done, total)
+
+    @staticmethod
+    def _default_filename() -> str:
+        """Имя файла экспорта по текущему времени"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"project_export_{timestamp}.xlsx"
+
+    @staticmethod
+    def _headers(schedule=None) -> List[str]:
+        """Заголовки колонок"""
+        if schedule is not None:
+            return ExcelExporter.HEADERS + ExcelExporter.SCHEDULE_HEADERS
+        return list(ExcelExporter.HEADERS)
+
+    @staticmethod
+    def _column_widths(schedule=None) -> List[int]:
+        """Ширина колонок"""
+        if schedule is not None:
+            return ExcelExporter.COLUMN_WIDTHS + ExcelExporter.SCHEDULE_COLUMN_WIDTHS
+        return list(ExcelExporter.COLUMN_WIDTHS)
+
+    @staticmethod
+    def _iter_rows(tasks: Iterable[Task], schedule=None) -> Iterator[list]:
+        """Генератор строк данных"""
+        for task in tasks:
+            yield ExcelExporter._row_values(task, schedule)
+
+    @staticmethod
+    def _row_values(task: Task, schedule=None) -> list:
+        """Значения строки для задачи"""
+        # Формируем текст зависимостей
+        deps_text = "\n".join(task.dependencies) if task.dependencies else "Нет"
+
+        row_data = [
+            task.id,
+            task.object,
+            task.start_date,
+            task.end_date,
+            f"{task.duration} дней",
+            deps_text,
+            task.type if task.type else "--"
+        ]
+
+        if schedule is not None:
+            task_schedule = schedule.get(task.id)
+            if task_schedule:
+                row_data += [
+                    task_schedule.early_start,
+                    task_schedule.early_finish,
+                    task_schedule.late_start,
+                    task_schedule.late_finish,
+                    task_schedule.total_float,
+                    "Да" if task_schedule.is_critical else "Нет"
+                ]
+            else:
+                row_data += ["--"] * 6
+        return row_data
 
 
 class AutoSaveManager:
-    """Менеджер автоматического сохранения"""
+    """
+    Менеджер автоматического сохранения
+
+    Сохранение выполняется, только если данные изменились с последней
+    записи (TaskManager.is_dirty); при подключенном журнале изменений -
+    только когда журнал вырос до ChangeJournal.COMPACT_BYTES. В потоке UI снимается копия задач,
+    кодирование JSON и запись с fsync идут в фоновом потоке, а результат
+    (время и размер) возвращается через after() в on_flush.
+    """
 
-    def __init__(self, task_manager: TaskManager, storage: DataStorage, 
-                 interval_ms: int = 30000):  # 30 секунд
+    POLL_MS = 100
+
+    def __init__(self, task_manager: TaskManager, storage: BaseStorage, 
+                 interval_ms: int = 30000,  # 30 секунд
+                 on_flush: Optional[Callable[[bool, float, int], None]] = None):
         self.task_manager = task_manager
         self.storage = storage
         self.interval_ms = interval_ms
+        self.on_flush = on_flush
         self.auto_save_enabled = True
         self.parent = None
         self.save_job = None
+        self.poll_job = None
+        self._writer: Optional[threading.Thread] = None
+        self._results: "queue.Queue[tuple]" = queue.Queue()
 
     def start(self, parent):
         """Запустить автосохранение"""
@@ -176,12 +1227,14 @@ class AutoSaveManager:
 
     def stop(self):
         """Остановить автосохранение"""
-        if self.save_job:
-            try:
-                self.parent.after_cancel(self.save_job)
-            except:
-                pass
+        for job in (self.save_job, self.poll_job):
+            if job:
+                try:
+                    self.parent.after_cancel(job)
+                except:
+                    pass
         self.save_job = None
+        self.poll_job = None
 
     def _schedule_save(self):
         """Запланировать следующее сохранение"""
@@ -191,17 +1244,86 @@ class AutoSaveManager:
         self.save_job = self.parent.after(self.interval_ms, self._perform_save)
 
     def _perform_save(self):
-        """Выполнить сохранение"""
+        """Выполнить сохранение, если есть изменения"""
         if self.auto_save_enabled:
-            tasks = self.task_manager.get_all_tasks()
-            self.storage.save_tasks(tasks)
+            if self.task_manager.is_dirty and not self.is_writing and self._snapshot_due():
+                version = self.task_manager.version
+                data = self.storage.snapshot(self.task_manager.iter_tasks())
+                self._writer = threading.Thread(
+                    target=self._write_in_background, args=(version, data), daemon=True
+                )
+                self._writer.start()
+                self.poll_job = self.parent.after(self.POLL_MS, self._poll_writer)
             # Планируем следующее сохранение
             self._schedule_save()
 
+    def _snapshot_due(self) -> bool:
+        """Нужен ли полный снимок (изменения уже в журнале, пока он мал)"""
+        journal = self.storage.journal
+        return journal is None or journal.needs_compaction()
+
+    @property
+    def is_writing(self) -> bool:
+        """Идет ли фоновая запись"""
+        return self._writer is not None and self._writer.is_alive()
+
+    def _write_in_background(self, version: int, data: dict):
+        """Фоновый поток: закодировать и записать снимок"""
+        started = time.perf_counter()
+        size = self.storage.write_snapshot(data)
+        self._results.put((version, size, time.perf_counter() - started))
+
+    def _poll_writer(self):
+        """Забрать результат фоновой записи (поток Tk)"""
+        self.poll_job = None
+        try:
+            version, size, elapsed = self._results.get_nowait()
+        except queue.Empty:
+            self.poll_job = self.parent.after(self.POLL_MS, self._poll_writer)
+            return
+
+        # Отметка о сохранении только продвигается вперед
+        if size is not None and version > self.task_manager.saved_version:
+            self.task_manager.mark_saved(version)
+        if self.on_flush:
+            self.on_flush(size is not None, elapsed, size or 0)
+
+    def _discard_background_result(self):
+        """
+        Забрать результат завершенной фоновой записи без отметки о сохранении
+
+        Вызывается перед записью более новой версии: иначе _poll_writer
+        позже отметил бы сохраненной старую версию.
+        """
+        if self.poll_job is not None:
+            try:
+                self.parent.after_cancel(self.poll_job)
+            except:
+                pass
+            self.poll_job = None
+        while True:
+            try:
+                self._results.get_nowait()
+            except queue.Empty:
+                break
+
     def save_now(self):
-        """Сохранить немедленно"""
-        tasks = self.task_manager.get_all_tasks()
-        return self.storage.save_tasks(tasks)
+        """Сохранить немедленно (дожидается фоновой записи)"""
+        if self._writer is not None:
+            self._writer.join()
+            self._discard_background_result()
+        version = self.task_manager.version
+        if self.storage.save_tasks(self.task_manager.iter_tasks()):
+            self.task_manager.mark_saved(version)
+            return True
+        return False
+
+    def set_storage(self, storage: BaseStorage):
+        """Писать в другое хранилище (дожидается фоновой записи в текущее)"""
+        if self._writer is not None:
+            self._writer.join()
+            self._discard_background_result()
+        self.storage = storage
 
     def toggle_auto_save(self, enabled: bool):
         """Включить/выключить автосохранение"""
@@ -209,4 +1331,4 @@ class AutoSaveManager:
         if enabled and self.parent:
             self._schedule_save()
         elif self.save_job:
-            self.stop()
\ No newline at end of file
+            self.stop()
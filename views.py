@@ -3,21 +3,58 @@
 """
 import customtkinter as ctk
 from tkinter import ttk
-from typing import Callable, Optional, List
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, List, Set
 from models import Task
 from tkcalendar import DateEntry
 from datetime import datetime
 
 
+def _longest_increasing_run(sequence: List[int]) -> Set[int]:
+    """Индексы элементов наибольшей возрастающей подпоследовательности"""
+    tails: List[int] = []       # значения хвостов подпоследовательностей
+    tail_indexes: List[int] = []
+    previous = [-1] * len(sequence)
+    for i, value in enumerate(sequence):
+        pos = bisect_left(tails, value)
+        if pos > 0:
+            previous[i] = tail_indexes[pos - 1]
+        if pos == len(tails):
+            tails.append(value)
+            tail_indexes.append(i)
+        else:
+            tails[pos] = value
+            tail_indexes[pos] = i
+
+    result = set()
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i != -1:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
 class MenuBarView:
     """Меню приложения - интегрировано в заголовок таблицы"""
     
     def __init__(self, parent, on_save: Callable, on_load: Callable, 
-                 on_export: Callable, on_exit: Callable):
+                 on_export: Callable, on_exit: Callable,
+                 on_export_gantt: Optional[Callable] = None,
+                 on_export_partitioned: Optional[Callable] = None,
+                 on_export_data: Optional[Callable] = None,
+                 on_import: Optional[Callable] = None,
+                 on_migrate_sqlite: Optional[Callable] = None,
+                 on_export_sqlite_json: Optional[Callable] = None):
         self.parent = parent
         self.on_save = on_save
         self.on_load = on_load
         self.on_export = on_export
+        self.on_export_gantt = on_export_gantt
+        self.on_export_partitioned = on_export_partitioned
+        self.on_export_data = on_export_data
+        self.on_import = on_import
+        self.on_migrate_sqlite = on_migrate_sqlite
+        self.on_export_sqlite_json = on_export_sqlite_json
         self.on_exit = on_exit
         # Меню теперь создается в TableContainerView
     
@@ -52,11 +89,29 @@ class MenuBarView:
         # Пункты меню
         self._create_menu_item(menu_frame, "💾 Сохранить", self.on_save, menu)
         self._create_menu_item(menu_frame, "📂 Открыть...", self.on_load, menu)
+        if self.on_import is not None:
+            self._create_menu_item(menu_frame, "📥 Импорт из Excel / CSV...",
+                                   self.on_import, menu)
+        if self.on_migrate_sqlite is not None:
+            self._create_menu_item(menu_frame, "🗄 Перенести проект в SQLite...",
+                                   self.on_migrate_sqlite, menu)
+        if self.on_export_sqlite_json is not None:
+            self._create_menu_item(menu_frame, "📤 Выгрузить базу в JSON...",
+                                   self.on_export_sqlite_json, menu)
         
         separator = ctk.CTkFrame(menu_frame, height=1, fg_color="#e0e0e0")
         separator.pack(fill="x", padx=5, pady=2)
         
         self._create_menu_item(menu_frame, "📊 Экспорт в Excel...", self.on_export, menu)
+        if self.on_export_gantt is not None:
+            self._create_menu_item(menu_frame, "📅 Экспорт в Excel с Ганттом...",
+                                   self.on_export_gantt, menu)
+        if self.on_export_partitioned is not None:
+            self._create_menu_item(menu_frame, "🗂 Экспорт по разделам WBS...",
+                                   self.on_export_partitioned, menu)
+        if self.on_export_data is not None:
+            self._create_menu_item(menu_frame, "📄 Экспорт в CSV / Parquet...",
+                                   self.on_export_data, menu)
         
         separator2 = ctk.CTkFrame(menu_frame, height=1, fg_color="#e0e0e0")
         separator2.pack(fill="x", padx=5, pady=2)
@@ -97,9 +152,14 @@ class MenuBarView:
 
 class FilterPanelView:
     """Панель фильтрации и поиска"""
-    
+
+    # Задержка перед поиском: нажатия в пределах окна объединяются
+    SEARCH_DELAY_MS = 250
+
     def __init__(self, parent, on_filter_change: Callable):
         self.on_filter_change = on_filter_change
+        self._search_job = None
+        self._last_search = ""
         self.filter_frame = ctk.CTkFrame(
             parent,
             fg_color="#f8f9fa",
@@ -161,7 +221,7 @@ class FilterPanelView:
             font=ctk.CTkFont(size=12)
         )
         self.search_entry.pack(side="left", fill="x", expand=True)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.on_filter_change())
+        self.search_entry.bind('<KeyRelease>', self._on_search_key)
         
         # Вторая строка: Тип зависимости и Количество зависимостей
         row2_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
@@ -300,9 +360,35 @@ class FilterPanelView:
         )
         self.date_checkbox.pack(side="left", padx=(10, 0))
     
+    def _on_search_key(self, event=None):
+        """Отложить поиск до паузы в наборе текста"""
+        text = self.search_entry.get()
+        if text == self._last_search:
+            return
+        self._last_search = text
+        self._cancel_search_job()
+        self._search_job = self.filter_frame.after(self.SEARCH_DELAY_MS,
+                                                   self._run_search)
+
+    def _run_search(self):
+        """Применить фильтры после паузы в наборе"""
+        self._search_job = None
+        self.on_filter_change()
+
+    def _cancel_search_job(self):
+        """Отменить отложенный поиск"""
+        if self._search_job is not None:
+            try:
+                self.filter_frame.after_cancel(self._search_job)
+            except:
+                pass
+            self._search_job = None
+
     def _reset_filters(self):
         """Сбросить все фильтры"""
+        self._cancel_search_job()
         self.search_entry.delete(0, 'end')
+        self._last_search = ""
         self.type_combo.set("Все")
         self.deps_combo.set("Все")
         self.date_filter_enabled.set(False)
@@ -348,6 +434,81 @@ class NotificationView:
         self.parent.after(duration, notification.destroy)
 
 
+class ProgressView:
+    """Панель прогресса длительной операции с кнопкой отмены"""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.frame = None
+        self.label = None
+        self.progress_bar = None
+        self.cancel_button = None
+        self.title = ""
+
+    @property
+    def is_visible(self) -> bool:
+        """Показана ли панель"""
+        return self.frame is not None
+
+    def show(self, title: str, on_cancel: Optional[Callable] = None):
+        """Показать панель"""
+        self.close()
+        self.title = title
+        self.frame = ctk.CTkFrame(
+            self.parent,
+            fg_color="#2d2d2d",
+            corner_radius=8
+        )
+        # Выше уведомлений (rely=0.95), чтобы они не перекрывали друг друга
+        self.frame.place(relx=0.5, rely=0.87, anchor="center")
+
+        self.label = ctk.CTkLabel(
+            self.frame,
+            text=title,
+            font=ctk.CTkFont(size=12),
+            text_color="white"
+        )
+        self.label.pack(side="left", padx=(20, 10), pady=10)
+
+        self.progress_bar = ctk.CTkProgressBar(self.frame, width=200)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=10, pady=10)
+
+        if on_cancel is not None:
+            self.cancel_button = ctk.CTkButton(
+                self.frame,
+                text="Отмена",
+                width=80,
+                command=on_cancel
+            )
+            self.cancel_button.pack(side="left", padx=(10, 20), pady=10)
+
+    def update(self, done: int, total: int, text: Optional[str] = None):
+        """Обновить прогресс"""
+        if self.frame is None:
+            return
+        if total:
+            self.progress_bar.set(min(done / total, 1.0))
+            text = text or f"{self.title}: {done} из {total}"
+        self.label.configure(text=text or f"{self.title}: {done}")
+
+    def set_cancelling(self):
+        """Показать, что операция отменяется"""
+        if self.cancel_button is not None:
+            self.cancel_button.configure(state="disabled")
+        if self.label is not None:
+            self.label.configure(text=f"{self.title}: отмена...")
+
+    def close(self):
+        """Скрыть панель"""
+        if self.frame is not None:
+            self.frame.destroy()
+        self.frame = None
+        self.label = None
+        self.progress_bar = None
+        self.cancel_button = None
+
+
 class ContextMenuView:
     """Контекстное меню для таблицы"""
 
@@ -473,13 +634,37 @@ class ContextMenuView:
 
 
 class TaskTableView:
-    """Представление таблицы задач с улучшенным выделением"""
+    """
+    Представление таблицы задач с улучшенным выделением
+
+    Для больших списков (больше VIRTUAL_THRESHOLD строк) таблица переходит
+    в виртуальный режим: в Treeview живут только видимые строки плюс
+    небольшой запас, полоса прокрутки отображается на срез списка задач,
+    а строки переиспользуются при прокрутке.
+    """
+
+    VIRTUAL_THRESHOLD = 5000
+    ROW_HEIGHT = 50
+    OVERSCAN = 2
 
     def __init__(self, parent_frame, on_dependency_click: Callable,
                  on_edit: Callable):
         self.on_dependency_click = on_dependency_click
         self.on_edit = on_edit
         self.processing_click = False
+        # Текущие строки: порядок ID и значения для сравнения при обновлении
+        self._row_order: List[str] = []
+        self._row_cache: Dict[str, tuple] = {}
+        # Виртуальный режим: весь список, смещение окна и пул строк
+        self.is_virtual = False
+        self._virtual_tasks: List[Task] = []
+        # ID -> позиция в _virtual_tasks (строится при первом поиске)
+        self._virtual_positions: Optional[Dict[str, int]] = None
+        self._virtual_schedule = None
+        self._offset = 0
+        self._pool: List[str] = []
+        self._pool_index: Dict[str, int] = {}
+        self._selected_task_id: Optional[str] = None
 
         self._configure_styles()
 
@@ -488,9 +673,10 @@ class TaskTableView:
 
         scrollbar = ttk.Scrollbar(tree_frame)
         scrollbar.pack(side="right", fill="y")
+        self.scrollbar = scrollbar
 
         columns = ("ID", "Объект", "Дата начала", "Дата окончания",
-                   "Длительность", "Зависит от", "Тип зависимости")
+                   "Длительность", "Зависит от", "Тип зависимости", "Резерв")
 
         self.tree = ttk.Treeview(
             tree_frame,
@@ -502,16 +688,30 @@ class TaskTableView:
 
         scrollbar.config(command=self.tree.yview)
 
-        column_widths = [120, 150, 130, 140, 100, 200, 150]
+        column_widths = [120, 150, 130, 140, 100, 200, 150, 90]
         for col, width in zip(columns, column_widths):
             self.tree.heading(col, text=col)
             self.tree.column(col, width=width, anchor="center")
 
+        # Задачи критического пути
+        self.tree.tag_configure("critical", foreground="#dc3545")
+
         self.tree.pack(fill="both", expand=True)
 
         self.tree.bind('<Button-1>', self._on_button_press, add='+')
         self.tree.bind('<Double-Button-1>', self._on_double_click, add='+')
 
+        # Прокрутка и навигация в виртуальном режиме
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        self.tree.bind('<Configure>', lambda e: self._render_window(), add='+')
+        self.tree.bind('<MouseWheel>', self._on_mouse_wheel, add='+')
+        self.tree.bind('<Button-4>', self._on_mouse_wheel, add='+')
+        self.tree.bind('<Button-5>', self._on_mouse_wheel, add='+')
+        self.tree.bind('<Up>', lambda e: self._on_key_navigate(-1), add='+')
+        self.tree.bind('<Down>', lambda e: self._on_key_navigate(1), add='+')
+        self.tree.bind('<Prior>', lambda e: self._on_key_navigate(-self._visible_rows()), add='+')
+        self.tree.bind('<Next>', lambda e: self._on_key_navigate(self._visible_rows()), add='+')
+
     def _configure_styles(self):
         """Настройка стилей с улучшенным выделением"""
         style = ttk.Style()
@@ -520,7 +720,7 @@ class TaskTableView:
         style.configure("Treeview",
                         background="white",
                         foreground="black",
-                        rowheight=50,
+                        rowheight=self.ROW_HEIGHT,
                         fieldbackground="white",
                         borderwidth=0,
                         font=('Segoe UI', 10))
@@ -580,47 +780,286 @@ class TaskTableView:
         self.tree.after(10, lambda: self.on_edit(event))
         return "break"
 
-    def populate(self, tasks: List[Task]):
-        """Заполнить таблицу данными"""
-        current_selection = self.tree.selection()
+    def populate(self, tasks: List[Task], schedule=None):
+        """
+        Заполнить таблицу данными (schedule - результат CriticalPathScheduler)
+
+        Строки привязаны к ID задач: применяется только разница с прошлым
+        состоянием (удаления, вставки, перемещения, изменения значений),
+        выделение сохраняется по ID.
+        """
+        if len(tasks) > self.VIRTUAL_THRESHOLD:
+            self._populate_virtual(tasks, schedule)
+            return
+        selected_id = None
         selected_index = None
-        if current_selection:
+        if self.is_virtual:
+            selected_id = self._leave_virtual_mode()
+        current_selection = self.tree.selection()
+        if selected_id is None and current_selection:
+            selected_id = current_selection[0]
             try:
-                selected_index = self.tree.index(current_selection[0])
+                selected_index = self.tree.index(selected_id)
             except:
                 pass
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
+        new_ids = [task.id for task in tasks]
+        new_positions = {task_id: i for i, task_id in enumerate(new_ids)}
+
+        # Удаления
+        stale = [iid for iid in self._row_order if iid not in new_positions]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self._row_cache[iid]
+
+        # Перемещения: строки из наибольшей возрастающей подпоследовательности
+        # остаются на месте, остальные временно отсоединяются
+        kept = [iid for iid in self._row_order if iid in new_positions]
+        stay = _longest_increasing_run([new_positions[iid] for iid in kept])
+        moving = {iid for i, iid in enumerate(kept) if i not in stay}
+        if moving:
+            self.tree.detach(*moving)
+
+        # Вставки, возврат перемещенных и обновление значений
+        for position, task in enumerate(tasks):
+            values, tags = self._row_values(task, schedule)
+            row = (values, tags)
+            cached = self._row_cache.get(task.id)
+            if cached is None:
+                self.tree.insert("", position, iid=task.id, values=values, tags=tags)
+            else:
+                if task.id in moving:
+                    self.tree.move(task.id, "", position)
+                if cached != row:
+                    self.tree.item(task.id, values=values, tags=tags)
+            self._row_cache[task.id] = row
+
+        self._row_order = new_ids
+
+        if selected_id in new_positions:
+            self.tree.selection_set(selected_id)
+            self.tree.see(selected_id)
+        elif selected_index is not None and new_ids:
+            # Выбранная задача исчезла - выделяем строку на ее месте
+            fallback = new_ids[min(selected_index, len(new_ids) - 1)]
+            self.tree.selection_set(fallback)
+            self.tree.see(fallback)
+
+    def update_rows(self, tasks: List[Task], schedule=None):
+        """Обновить значения только указанных строк (по ID задачи)"""
+        if self.is_virtual:
+            self._render_window()
+            return
         for task in tasks:
-            self.tree.insert("", "end", values=(
-                task.id,
-                task.object,
-                task.start_date,
-                task.end_date,
-                task.duration,
-                task.get_dependency_text(),
-                task.type
-            ))
-
-        if selected_index is not None:
-            try:
-                items = self.tree.get_children()
-                if 0 <= selected_index < len(items):
-                    self.tree.selection_set(items[selected_index])
-                    self.tree.see(items[selected_index])
-            except:
-                pass
+            if task.id in self._row_cache:
+                values, tags = self._row_values(task, schedule)
+                self._row_cache[task.id] = (values, tags)
+                self.tree.item(task.id, values=values, tags=tags)
+
+    @staticmethod
+    def _row_values(task: Task, schedule=None) -> tuple:
+        """Значения и теги строки таблицы для задачи"""
+        total_float = schedule.get_float(task.id) if schedule else None
+        values = (
+            task.id,
+            task.object,
+            task.start_date,
+            task.end_date,
+            task.duration,
+            task.get_dependency_text(),
+            task.type,
+            total_float if total_float is not None else "--"
+        )
+        tags = ("critical",) if total_float is not None and total_float <= 0 else ()
+        return values, tags
 
     def get_selected_index(self) -> Optional[int]:
         """Получить индекс выбранной строки"""
+        if self.is_virtual:
+            return self._virtual_selected_index()
         selection = self.tree.selection()
         if not selection:
             return None
         row_id = selection[0]
         return self.tree.index(row_id)
 
+    def get_row_index(self, row_id: str) -> int:
+        """Получить индекс строки в списке задач по элементу Treeview"""
+        if self.is_virtual:
+            return self._offset + self._pool_index[row_id]
+        return self.tree.index(row_id)
+
+    # Виртуальный режим
+
+    def _populate_virtual(self, tasks: List[Task], schedule):
+        """Показать большой список в виртуальном режиме"""
+        if not self.is_virtual:
+            selection = self.tree.selection()
+            self._selected_task_id = selection[0] if selection else None
+            self._enter_virtual_mode()
+        self._virtual_tasks = tasks
+        self._virtual_positions = None
+        self._virtual_schedule = schedule
+        self._render_window()
+
+    def _enter_virtual_mode(self):
+        """Переключиться с обычных строк на пул переиспользуемых строк"""
+        if self._row_order:
+            self.tree.delete(*self._row_order)
+        self._row_order = []
+        self._row_cache = {}
+        self._offset = 0
+        self.is_virtual = True
+        self.tree.configure(yscrollcommand=lambda *args: None)
+        self.scrollbar.config(command=self._on_virtual_scroll)
+
+    def _leave_virtual_mode(self) -> Optional[str]:
+        """Вернуться к обычным строкам; возвращает ID выбранной задачи"""
+        if self._pool:
+            self.tree.delete(*self._pool)
+        selected_id = self._selected_task_id
+        self._pool = []
+        self._pool_index = {}
+        self._virtual_tasks = []
+        self._virtual_positions = None
+        self._virtual_schedule = None
+        self._offset = 0
+        self.is_virtual = False
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.config(command=self.tree.yview)
+        self._row_order = []
+        self._selected_task_id = None
+        return selected_id
+
+    def _visible_rows(self) -> int:
+        """Число строк, помещающихся в видимой области"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return 20
+        return max(1, height // self.ROW_HEIGHT)
+
+    def _render_window(self):
+        """Отрисовать видимое окно списка в строках пула"""
+        if not self.is_virtual:
+            return
+        tasks = self._virtual_tasks
+        visible = self._visible_rows()
+        size = visible + self.OVERSCAN
+        self._offset = max(0, min(self._offset, len(tasks) - visible))
+
+        while len(self._pool) < size:
+            iid = f"__row_{len(self._pool)}"
+            self.tree.insert("", "end", iid=iid, values=())
+            self._pool_index[iid] = len(self._pool)
+            self._pool.append(iid)
+        while len(self._pool) > size:
+            iid = self._pool.pop()
+            del self._pool_index[iid]
+            self.tree.delete(iid)
+
+        window = tasks[self._offset:self._offset + size]
+        selected_row = None
+        for k, iid in enumerate(self._pool):
+            if k < len(window):
+                task = window[k]
+                values, tags = self._row_values(task, self._virtual_schedule)
+                if task.id == self._selected_task_id:
+                    selected_row = iid
+            else:
+                values, tags = (), ()
+            self.tree.item(iid, values=values, tags=tags)
+
+        if selected_row is not None:
+            self.tree.selection_set(selected_row)
+        else:
+            self.tree.selection_set(())
+        self.tree.yview_moveto(0)
+
+        if tasks:
+            first = self._offset / len(tasks)
+            last = min(1.0, (self._offset + visible) / len(tasks))
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_to(self, offset: int):
+        """Сдвинуть окно на новое смещение"""
+        if offset != self._offset:
+            self._offset = offset
+            self._render_window()
+
+    def _on_virtual_scroll(self, *args):
+        """Команда полосы прокрутки в виртуальном режиме"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self._virtual_tasks)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= self._visible_rows()
+            self._scroll_to(self._offset + step)
+
+    def _on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши в виртуальном режиме"""
+        if not self.is_virtual:
+            return None
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._scroll_to(self._offset + step)
+        return "break"
+
+    def _on_key_navigate(self, delta: int):
+        """Перемещение выделения клавишами в виртуальном режиме"""
+        if not self.is_virtual or not self._virtual_tasks:
+            return None
+        current = self._virtual_selected_index()
+        if current is None:
+            current = self._offset
+        else:
+            current += delta
+        current = max(0, min(current, len(self._virtual_tasks) - 1))
+
+        visible = self._visible_rows()
+        if current < self._offset:
+            self._offset = current
+        elif current >= self._offset + visible:
+            self._offset = current - visible + 1
+        self._selected_task_id = self._virtual_tasks[current].id
+        self._render_window()
+        return "break"
+
+    def _on_select(self, event=None):
+        """Запомнить выбранную задачу по ID (виртуальный режим)"""
+        if not self.is_virtual:
+            return
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._pool_index:
+            return
+        index = self._offset + self._pool_index[selection[0]]
+        if index < len(self._virtual_tasks):
+            self._selected_task_id = self._virtual_tasks[index].id
+
+    def _virtual_selected_index(self) -> Optional[int]:
+        """Индекс выбранной задачи в полном списке виртуального режима"""
+        selection = self.tree.selection()
+        if selection and selection[0] in self._pool_index:
+            index = self._offset + self._pool_index[selection[0]]
+            if index < len(self._virtual_tasks):
+                return index
+        if self._selected_task_id is None:
+            return None
+        # Выбранная задача прокручена за пределы окна
+        if self._virtual_positions is None:
+            self._virtual_positions = {task.id: index
+                                       for index, task in enumerate(self._virtual_tasks)}
+        return self._virtual_positions.get(self._selected_task_id)
+
     def bind_delete(self, callback: Callable):
         """Привязать обработчик удаления"""
         self.tree.bind('<Delete>', callback)
@@ -0,0 +1,211 @@
+"""
+Минимальная запись книг Excel (.xlsx) без openpyxl
+
+Используется параллельным экспортом: XML листов формируется в рабочих
+процессах независимо друг от друга. Строки пишутся прямо в ячейки
+(inline), а стили фиксированы, поэтому готовые листы собираются в одну
+книгу без перенумерации общих строк и стилей.
+"""
+import re
+import zipfile
+from typing import Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+# Индексы стилей ячеек (cellXfs в styles.xml)
+STYLE_DEFAULT, STYLE_HEADER, STYLE_CENTER, STYLE_LEFT, STYLE_INFO = range(5)
+
+# Ограничения Excel на имя листа
+SHEET_TITLE_LIMIT = 31
+_SHEET_TITLE_FORBIDDEN = re.compile(r"[\[\]:*?/\\]")
+# Управляющие символы, недопустимые в XML
+_ILLEGAL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_BORDER = "".join(
+    f'<{side} style="thin"><color rgb="FFD0D0D0"/></{side}>'
+    for side in ("left", "right", "top", "bottom")
+)
+_STYLES_XML = (
+    _XML_DECLARATION
+    + f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="4">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Segoe UI"/></font>'
+    '<font><sz val="10"/><name val="Segoe UI"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF3B8ED0"/>'
+    '<bgColor rgb="FF3B8ED0"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    f'<border>{_BORDER}<diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" '
+    'applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="1" xfId="0" applyFont="1" '
+    'applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="1" xfId="0" applyFont="1" '
+    'applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="left" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="3" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def column_letter(index: int) -> str:
+    """Буквенное имя столбца по номеру (с 1)"""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def sheet_title(name: str, used: set) -> str:
+    """Допустимое и уникальное (без учета регистра) имя листа"""
+    base = _SHEET_TITLE_FORBIDDEN.sub("_", name).strip("'") or "Лист"
+    title = base[:SHEET_TITLE_LIMIT]
+    counter = 2
+    while title.lower() in used:
+        suffix = f" ({counter})"
+        title = base[:SHEET_TITLE_LIMIT - len(suffix)] + suffix
+        counter += 1
+    used.add(title.lower())
+    return title
+
+
+def _cell(ref: str, value, style: int) -> str:
+    """XML одной ячейки"""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_CHARS.sub("", str(value)))
+    return (f'<c r="{ref}" s="{style}" t="inlineStr">'
+            f'<is><t xml:space="preserve">{text}</t></is></c>')
+
+
+def render_sheet(headers: Sequence[str], widths: Sequence[float],
+                 rows: Sequence[Sequence], left_columns: Sequence[int] = (),
+                 footer: Sequence[Tuple[str, object]] = ()) -> bytes:
+    """
+    Сформировать XML листа: заголовок, строки данных и итоговые строки
+
+    Первая строка закреплена, left_columns (с 1) выравниваются влево.
+    Функция не зависит от состояния процесса и вызывается в рабочих
+    процессах.
+    """
+    column_count = max(len(headers), max((len(row) for row in rows), default=0))
+    letters = [column_letter(i) for i in range(1, column_count + 1)]
+    styles = [STYLE_LEFT if i in left_columns else STYLE_CENTER
+              for i in range(1, column_count + 1)]
+
+    parts = [
+        _XML_DECLARATION,
+        f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">',
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        '</sheetView></sheetViews>',
+        '<cols>',
+    ]
+    parts += [f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+              for i, width in enumerate(widths, start=1)]
+    parts.append('</cols><sheetData>')
+
+    parts.append('<row r="1">')
+    parts += [_cell(f"{letters[i]}1", header, STYLE_HEADER)
+              for i, header in enumerate(headers)]
+    parts.append('</row>')
+
+    row_number = 1
+    for row in rows:
+        row_number += 1
+        parts.append(f'<row r="{row_number}">')
+        parts += [_cell(f"{letters[i]}{row_number}", value, styles[i])
+                  for i, value in enumerate(row) if value is not None]
+        parts.append('</row>')
+
+    if footer:
+        row_number += 1
+    for label, value in footer:
+        row_number += 1
+        parts.append(f'<row r="{row_number}">')
+        parts.append(_cell(f"A{row_number}", label, STYLE_INFO))
+        parts.append(_cell(f"B{row_number}", value, STYLE_DEFAULT))
+        parts.append('</row>')
+
+    parts.append('</sheetData></worksheet>')
+    return "".join(parts).encode("utf-8")
+
+
+def write_workbook(filename: str, sheets: Sequence[Tuple[str, bytes]]):
+    """Собрать книгу из готовых листов (имя, XML листа)"""
+    content_types = [
+        _XML_DECLARATION,
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">',
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>',
+        '<Default Extension="xml" ContentType="application/xml"/>',
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>',
+        '<Override PartName="/xl/styles.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>',
+    ]
+    content_types += [
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, len(sheets) + 1)
+    ]
+    content_types.append('</Types>')
+
+    workbook = [_XML_DECLARATION, f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>']
+    workbook_rels = [_XML_DECLARATION, f'<Relationships xmlns="{_PACKAGE_REL_NS}">']
+    for i, (title, _) in enumerate(sheets, start=1):
+        workbook.append(f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>')
+        workbook_rels.append(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" '
+                             f'Target="worksheets/sheet{i}.xml"/>')
+    workbook.append('</sheets></workbook>')
+    workbook_rels.append(f'<Relationship Id="rId{len(sheets) + 1}" Type="{_REL_NS}/styles" '
+                         'Target="styles.xml"/>')
+    workbook_rels.append('</Relationships>')
+
+    root_rels = (
+        _XML_DECLARATION
+        + f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        archive.writestr("[Content_Types].xml", "".join(content_types))
+        archive.writestr("_rels/.rels", root_rels)
+        archive.writestr("xl/workbook.xml", "".join(workbook))
+        archive.writestr("xl/_rels/workbook.xml.rels", "".join(workbook_rels))
+        archive.writestr("xl/styles.xml", _STYLES_XML)
+        for i, (_, xml) in enumerate(sheets, start=1):
+            archive.writestr(f"xl/worksheets/sheet{i}.xml", xml)
+
+
+def write_sheet_file(filename: str, title: str, headers: Sequence[str],
+                     widths: Sequence[float], rows: Sequence[Sequence],
+                     left_columns: Sequence[int] = (),
+                     footer: Sequence[Tuple[str, object]] = ()) -> str:
+    """Записать книгу из одного листа (вызывается в рабочих процессах)"""
+    xml = render_sheet(headers, widths, rows, left_columns, footer)
+    write_workbook(filename, [(title, xml)])
+    return filename